@@ -1,26 +1,47 @@
 # SAFE-AI-FRAMEWORK/backend/main.py
 from pathlib import Path
-from datetime import datetime
 import os
 import json
 import shutil
+import hashlib
+import stat
+import mimetypes
 import re, subprocess
+from fnmatch import fnmatch
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Body
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Body, Header, Request, BackgroundTasks
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from plugin_router import router as plugins_router
+from plugin_router import router as plugins_router, close_http_client as close_plugin_http_client
+from plugin_pool import warm_pool
+from upload_router import router as uploads_router
+from upload_engine import sync_upload, clear_manifest
+from project_index import sort_key, watch_project
+from file_access import file_etag, etag_matches, read_line_window
+from build_log import build_log, split_lines
+from job_runner import Job, job_runner
+from plugin_manager import (
+    docker_client, plugin_instances, containers_named, reload_plugin, remove_labelled_containers,
+    BATCH_SHARD_LABEL,
+)
+from docker import errors as docker_errors
 
 
 
 from process_registry import (
-    STORAGE_DIR, PROJECT_DIR, JAR_FILE, META_FILE,
+    PROJECT_DIR, JAR_FILE, META_FILE,
     write_pid, read_pid, clear_pid,
     is_running, find_runnable_jar, reset_project_dir, status_dict, write_meta,
+    project_index,
     # Docker container registry helpers (must exist in process_registry.py)
-    read_containers, add_container, remove_container, clear_containers
+    read_containers, get_container, add_container, remove_container, clear_containers,
+    read_pids, add_pid, clear_pids,
 )
 
 # ==============================================================================
@@ -74,6 +95,7 @@ class DockerStartReq(BaseModel):
                   "node server.js || node index.js")
     env: Optional[Dict[str, str]] = None      # e.g. {"PORT":"5173"}
     ports: Optional[List[str]] = None         # e.g. ["5173:5173","3001:3001"]
+    dep_cache: bool = True                    # shared npm cache + node_modules volume keyed by package-lock.json
 
 class DockerStartManyReq(BaseModel):
     apps: List[DockerStartReq]
@@ -88,7 +110,7 @@ def _safe_join(base: Path, rel: str) -> Path:
     return p
 
 def _project_present() -> bool:
-    return PROJECT_DIR.exists() and any(PROJECT_DIR.rglob("*"))
+    return not project_index.is_empty()
 
 def _npm_exe() -> str:
     return "npm.cmd" if os.name == "nt" else "npm"
@@ -96,56 +118,126 @@ def _npm_exe() -> str:
 def _node_exe() -> str:
     return "node.exe" if os.name == "nt" else "node"
 
-def _docker_exe() -> str:
-    return "docker.exe" if os.name == "nt" else "docker"
-
 def _which(cmd: str) -> Optional[str]:
     return shutil.which(cmd)
 
 def _ensure_docker():
-    if not _which(_docker_exe()):
-        raise HTTPException(500, detail="`docker` not found on PATH. Install Docker Desktop/Engine and restart the terminal.")
-    # quick ping to engine (won’t spam logs)
     try:
-        subprocess.run([_docker_exe(), "info"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        docker_client.ping()
     except Exception:
         raise HTTPException(500, detail="Docker daemon is not running.")
 
 # ==============================================================================
 # Build log helpers (optional but handy)
 # ==============================================================================
-BUILD_LOG = STORAGE_DIR / "build.log"
-
-def _append_log(msg: str):
-    BUILD_LOG.parent.mkdir(parents=True, exist_ok=True)
-    with BUILD_LOG.open("a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] {msg}\n")
-
-def _run(cmd: List[str], cwd: Path, timeout: int = 900) -> int:
-    _append_log(f"RUN: {' '.join(cmd)} (cwd={cwd})")
-    try:
-        proc = subprocess.run(
-            cmd, cwd=str(cwd),
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            timeout=timeout, check=False,
-        )
-        with BUILD_LOG.open("a", encoding="utf-8") as f:
-            f.write(proc.stdout.decode(errors="ignore"))
-        _append_log(f"EXIT: {proc.returncode}")
-        return proc.returncode
-    except subprocess.TimeoutExpired:
-        _append_log("TIMEOUT")
-        return 124
-    except Exception as e:
-        _append_log(f"ERROR: {e}")
-        return 1
+BUILD_LOG_TAIL_BYTES = 100_000
+BUILD_LOG_POLL_SECONDS = 0.25
+BUILD_LOG_KEEPALIVE_SECONDS = 15.0
 
 @app.get("/core/build-log")
-def core_build_log():
-    if not BUILD_LOG.exists():
-        return {"log": ""}
-    txt = BUILD_LOG.read_text(encoding="utf-8")
-    return {"log": txt[-100_000:]}  # last 100KB
+def core_build_log(run: Optional[int] = Query(None, description="Only this run's output")):
+    if run is None:
+        return {"log": build_log.tail(BUILD_LOG_TAIL_BYTES), "offset": build_log.end}
+    rec = build_log.get_run(run)
+    if rec is None:
+        raise HTTPException(404, detail="Unknown run")
+    end = rec["end"] if rec["end"] is not None else build_log.end
+    start = max(rec["start"], end - BUILD_LOG_TAIL_BYTES)
+    data = build_log.read_range(start, end)
+    return {"log": data.decode("utf-8", errors="ignore"), "offset": end, "run": rec}
+
+@app.get("/core/build-log/runs")
+def core_build_log_runs():
+    return {"runs": build_log.runs(), "offset": build_log.end}
+
+def _sse_lines(lines: List[bytes], event_id: int) -> str:
+    data = "".join(f"data: {ln.decode('utf-8', errors='ignore').rstrip(chr(13))}\n" for ln in lines)
+    return f"id: {event_id}\n{data}\n"
+
+@app.get("/core/build-log/stream")
+async def core_build_log_stream(
+    request: Request,
+    offset: Optional[int] = Query(None, ge=0, description="Offset to resume from (default: only new output)"),
+    run: Optional[int] = Query(None, description="Stream one run from its start; ends when the run finishes"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events: one event per batch of complete lines, `id` is the log
+    offset after them, so EventSource reconnects resume where they left off.
+    """
+    rec = build_log.get_run(run) if run is not None else None
+    if run is not None and rec is None:
+        raise HTTPException(404, detail="Unknown run")
+
+    if last_event_id and last_event_id.isdigit():
+        start = int(last_event_id)
+    elif offset is not None:
+        start = offset
+    elif rec is not None:
+        start = rec["start"]
+    else:
+        start = build_log.end
+
+    async def events():
+        pos = start
+        first = build_log.first_offset()
+        if pos < first:
+            yield f"event: truncated\ndata: {first}\n\n"
+            pos = first
+        pending = b""
+        idle = 0.0
+        while not await request.is_disconnected():
+            stop = rec.get("end") if rec is not None else None
+            limit = (stop if stop is not None else build_log.end) - pos
+            if limit > 0:
+                data, pos = await asyncio.to_thread(build_log.read, pos, min(limit, 64 * 1024))
+                lines, pending = split_lines(pending + data)
+                if lines:
+                    # the id is the offset right after the last emitted newline
+                    yield _sse_lines(lines, pos - len(pending))
+                idle = 0.0
+                continue
+            if stop is not None:
+                if pending:
+                    yield _sse_lines([pending], pos)
+                yield f"event: end\ndata: {json.dumps({'run': rec['id'], 'exit_code': rec['exit_code']})}\n\n"
+                return
+            if idle >= BUILD_LOG_KEEPALIVE_SECONDS:
+                yield ": keepalive\n\n"
+                idle = 0.0
+            await asyncio.sleep(BUILD_LOG_POLL_SECONDS)
+            idle += BUILD_LOG_POLL_SECONDS
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ==============================================================================
+# Jobs (long operations run in the background; see job_runner.py)
+# ==============================================================================
+@app.get("/core/jobs")
+def list_jobs():
+    return {"jobs": [j.to_dict() for j in job_runner.list()]}
+
+@app.get("/core/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Unknown job")
+    return job.to_dict()
+
+@app.post("/core/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_runner.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Unknown job")
+    return {"ok": job_runner.cancel(job_id), "job": job.to_dict()}
+
+@app.on_event("shutdown")
+async def _stop_jobs():
+    await job_runner.shutdown()
 
 # ==============================================================================
 # Upload (webkitdirectory)
@@ -155,18 +247,17 @@ async def upload_folder(
     files: List[UploadFile] = File(..., description="Multiple files with webkitRelativePath"),
     root: str = Form("core_project"),
 ):
-    reset_project_dir()
-    saved = 0
-    for uf in files:
-        rel_path = Path(uf.filename)  # contains relative path from browser
-        dest = PROJECT_DIR / rel_path
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        with dest.open("wb") as f:
-            while chunk := await uf.read(1024 * 1024):
-                f.write(chunk)
-        saved += 1
+    # Sync instead of wipe + rewrite: unchanged files (same sha256) are skipped,
+    # files missing from the new upload are removed.
+    try:
+        stats = await sync_upload(files)
+    except ValueError as e:
+        raise HTTPException(400, detail=str(e))
+    finally:
+        project_index.rebuild()
+    saved = stats["files"]
     write_meta({"mode": "folder", "root": root, "files": saved})
-    return {"ok": True, "message": f"Folder uploaded with {saved} files."}
+    return {"ok": True, "message": f"Folder uploaded with {saved} files.", **stats}
 
 # ==============================================================================
 # Explorer + Editor
@@ -175,37 +266,133 @@ async def upload_folder(
 def status():
     return status_dict()
 
+TREE_PAGE_SIZE = 500
+TREE_MAX_PAGE_SIZE = 5000
+TREE_NESTED_PAGE_SIZE = 100            # per sub-folder when depth > 1
+TREE_DEFAULT_IGNORE = "node_modules,.git,target"
+
+def _tree_cursor(name: str, is_dir: bool) -> str:
+    return f"{'d' if is_dir else 'f'}:{name}"
+
+def _parse_tree_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    kind, sep, name = cursor.partition(":")
+    if not sep or kind not in ("d", "f"):
+        raise HTTPException(400, detail="Invalid cursor")
+    return sort_key(name, kind == "d")
+
+def _tree_page(rel: str, after, limit: int, depth: int, skip) -> dict:
+    items = []
+    page, more = project_index.page(rel, after, limit, skip)
+    for name, entry in page:
+        child = f"{rel}/{name}" if rel else name
+        item = {"name": name, "path": child, "type": "dir" if entry.is_dir else "file", "mtime": entry.mtime}
+        if entry.is_dir:
+            item["size"] = project_index.dir_size(child)
+            item["children"] = project_index.child_count(child, skip)
+            if depth > 1:
+                sub = _tree_page(child, None, min(limit, TREE_NESTED_PAGE_SIZE), depth - 1, skip)
+                item["items"], item["next_cursor"] = sub["items"], sub["next_cursor"]
+        else:
+            item["size"] = entry.size
+        items.append(item)
+    last = page[-1] if more else None
+    return {"items": items, "next_cursor": _tree_cursor(last[0], last[1].is_dir) if last else None}
+
 @app.get("/core/tree")
-def core_tree(dir: str = ""):
+def core_tree(
+    dir: str = "",
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(TREE_PAGE_SIZE, ge=1, le=TREE_MAX_PAGE_SIZE),
+    depth: int = Query(1, ge=1, le=4, description="Folder levels to include (nested pages are capped)"),
+    ignore: str = Query(TREE_DEFAULT_IGNORE, description="Comma-separated name patterns to hide; empty shows all"),
+):
     if not _project_present():
         raise HTTPException(404, detail="No project uploaded")
     base = _safe_join(PROJECT_DIR, dir)
-    if not base.exists() or not base.is_dir():
+    rel = project_index.relative(base)
+    entry = project_index.get(rel) if rel is not None else None
+    if entry is None or not entry.is_dir:
         raise HTTPException(404, detail="Folder not found")
 
-    items = []
-    for entry in sorted(base.iterdir(), key=lambda x: (x.is_file(), x.name.lower())):
-        items.append({
-            "name": entry.name,
-            "path": str(entry.relative_to(PROJECT_DIR)),
-            "type": "file" if entry.is_file() else "dir",
-        })
-    return {"cwd": str(base.relative_to(PROJECT_DIR)), "items": items}
+    patterns = [p.strip() for p in ignore.split(",") if p.strip()]
+    skip = (lambda name: any(fnmatch(name, p) for p in patterns)) if patterns else None
 
-@app.get("/core/file")
-def core_file(path: str = Query(..., description="Relative path inside project")):
+    page = _tree_page(rel, _parse_tree_cursor(cursor), limit, depth, skip)
+    return {
+        "cwd": rel,
+        "total": project_index.child_count(rel, skip),
+        "size": project_index.dir_size(rel),
+        **page,
+    }
+
+FILE_PREVIEW_MAX_BYTES = 1_000_000
+FILE_MAX_LINES = 100_000
+
+def _project_file(path: str):
     if not _project_present():
         raise HTTPException(404, detail="No project uploaded")
     fpath = _safe_join(PROJECT_DIR, path)
-    if not fpath.exists() or not fpath.is_file():
+    try:
+        st = fpath.stat()
+    except OSError:
+        raise HTTPException(404, detail="File not found")
+    if not stat.S_ISREG(st.st_mode):
         raise HTTPException(404, detail="File not found")
-    if fpath.stat().st_size > 1_000_000:
-        raise HTTPException(413, detail="File too large to preview")
-    content = fpath.read_text(encoding="utf-8", errors="ignore")
-    return {"path": path, "content": content}
+    return fpath, st
+
+@app.get("/core/file")
+def core_file(
+    path: str = Query(..., description="Relative path inside project"),
+    offset: Optional[int] = Query(None, ge=0, description="First line (0-based) of a line window"),
+    limit: Optional[int] = Query(None, ge=1, le=FILE_MAX_LINES, description="Number of lines in the window"),
+    if_none_match: Optional[str] = Header(None),
+):
+    fpath, st = _project_file(path)
+    etag = file_etag(st)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if offset is None and limit is None:
+        if st.st_size > FILE_PREVIEW_MAX_BYTES:
+            raise HTTPException(413, detail="File too large to preview; use offset/limit or /core/file/raw")
+        content = fpath.read_text(encoding="utf-8", errors="ignore")
+        return JSONResponse({"path": path, "content": content}, headers={"ETag": etag})
+
+    # line window: only the requested lines are read, via a cached newline index
+    offset = offset or 0
+    limit = limit or 1000
+    content, total = read_line_window(fpath, st, offset, limit)
+    return JSONResponse(
+        {
+            "path": path,
+            "content": content,
+            "offset": offset,
+            "limit": limit,
+            "total_lines": total,
+            "size": st.st_size,
+            "eof": offset + limit >= total,
+        },
+        headers={"ETag": etag},
+    )
+
+@app.get("/core/file/raw")
+def core_file_raw(
+    path: str = Query(..., description="Relative path inside project"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Raw bytes, streamed from disk; honours Range/If-Range and If-None-Match."""
+    fpath, st = _project_file(path)
+    etag = file_etag(st)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    media_type = mimetypes.guess_type(fpath.name)[0] or "application/octet-stream"
+    return FileResponse(fpath, stat_result=st, media_type=media_type, headers={"ETag": etag})
 
 @app.post("/core/save")
 def core_save(
+    background: BackgroundTasks,
     path: str = Query(..., description="Relative path to save inside project"),
     content: str = Body(..., media_type="text/plain"),
 ):
@@ -214,25 +401,49 @@ def core_save(
     fpath = _safe_join(PROJECT_DIR, path)
     fpath.parent.mkdir(parents=True, exist_ok=True)
     fpath.write_text(content, encoding="utf-8")
+    project_index.update_path(fpath)
+    _reload_changed_plugin(fpath, background)
     return {"ok": True, "path": path}
 
 # ==============================================================================
 # Plugins (files + discovery)
 # ==============================================================================
+def _reload_changed_plugin(fpath: Path, background: BackgroundTasks) -> None:
+    """Running runners poll for changes; this makes an edit visible right after the save."""
+    try:
+        rel = fpath.relative_to(PLUGINS_DIR)
+    except ValueError:
+        return
+    if len(rel.parts) > 1:
+        background.add_task(_reload_quietly, rel.parts[0])
+
+def _reload_quietly(slug: str) -> None:
+    try:
+        reload_plugin(slug)
+    except Exception as e:
+        print(f"[plugins] reload of {slug} failed: {e}")
+
 @app.post("/core/plugin/new")
 def create_plugin(
+    background: BackgroundTasks,
     path: str = Query(..., description="Relative path under ai_plugins/"),
     content: str = Body(..., media_type="text/plain"),
 ):
     dest = _safe_join(PLUGINS_DIR, path)
     dest.parent.mkdir(parents=True, exist_ok=True)
     dest.write_text(content, encoding="utf-8")
+    project_index.update_path(dest)
+    _reload_changed_plugin(dest, background)
     return {"ok": True, "path": str(dest.relative_to(PROJECT_DIR))}
 
 @app.get("/core/plugins")
 def list_plugins():
     out = []
-    for mf in PLUGINS_DIR.rglob("manifest.json"):
+    prefix = PLUGINS_DIR.relative_to(PROJECT_DIR).as_posix() + "/"
+    for rel in project_index.find_name("manifest.json"):
+        if not rel.startswith(prefix):
+            continue
+        mf = PROJECT_DIR / rel
         try:
             data = json.loads(mf.read_text(encoding="utf-8"))
             name = data.get("name") or mf.parent.name
@@ -258,15 +469,10 @@ def _read_package_json(root: Path) -> dict:
         return {}
 
 def _node_candidates(max_depth: int = 3) -> List[Path]:
-    if not PROJECT_DIR.exists():
-        return []
     out: List[Path] = []
-    for pkg in PROJECT_DIR.rglob("package.json"):
-        if "node_modules" in pkg.parts:
-            continue
-        try:
-            rel = pkg.parent.relative_to(PROJECT_DIR)
-        except ValueError:
+    for pkg in project_index.find_name("package.json"):
+        rel = Path(pkg).parent
+        if "node_modules" in rel.parts:
             continue
         if len(rel.parts) <= max_depth:
             out.append(rel)
@@ -305,14 +511,15 @@ def _node_project_root(subdir: Optional[str]) -> Optional[Path]:
 def node_candidates():
     return {"candidates": [str(p).replace("\\", "/") for p in _node_candidates()]}
 
-def _ensure_node_deps(root: Path):
+async def _ensure_node_deps(job: Job, root: Path):
     npm = _which(_npm_exe())
     if not npm:
         raise HTTPException(500, detail="`npm` not found on PATH. Install Node.js and start uvicorn from that terminal.")
     cmd = [npm, "ci"] if (root / "package-lock.json").exists() else [npm, "install"]
-    rc = _run(cmd, cwd=root, timeout=1800)
+    rc, _ = await job_runner.run_command(job, cmd, cwd=root, timeout=1800)
     if rc != 0:
         raise HTTPException(500, detail=f"`{' '.join(cmd)}` failed in {root}. See /core/build-log.")
+    project_index.update_path(root / "node_modules")
 
 def _pick_node_start_command(pkg: dict, root: Path) -> List[str]:
     scripts = (pkg.get("scripts") or {})
@@ -355,38 +562,40 @@ def _start_java(port: Optional[int]) -> dict:
         raise HTTPException(500, detail=f"Failed to start core: {e}")
 
 @app.post("/core/start")
-def start_core(
+async def start_core(
     port: Optional[int] = Query(None, description="Only for preview if your dev server listens on this port"),
     prefer: Optional[str] = Query(None, description="Force 'node' or 'java'"),
     subdir: Optional[str] = Query(None, description="Node app subdir (contains package.json)"),
 ):
+    """Node: returns a job handle at once (npm install + start run in the background)."""
     node_root = _node_project_root(subdir)
 
     try_node_first = (prefer == "node") or (prefer is None and node_root is not None)
     try_java_first = (prefer == "java")
 
     if try_node_first and node_root:
-        _ensure_node_deps(node_root)
         cmd = _pick_node_start_command(_read_package_json(node_root), node_root)
         env = os.environ.copy()
         if port:
             env["PORT"] = str(port)
-        try:
-            proc = subprocess.Popen(
-                cmd, cwd=str(node_root), env=env,
-                stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
-            )
+        app_url = f"http://localhost:{port}" if port else None
+
+        async def work(job: Job) -> dict:
+            await _ensure_node_deps(job, node_root)
+            try:
+                proc = subprocess.Popen(
+                    cmd, cwd=str(node_root), env=env,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+                )
+            except FileNotFoundError:
+                raise HTTPException(500, detail="Failed to execute npm/node. Ensure Node.js is installed.")
+            except Exception as e:
+                raise HTTPException(500, detail=f"Failed to start Node app: {e}")
             write_pid(proc.pid)  # legacy single PID
-            return {
-                "ok": True,
-                "pid": proc.pid,
-                "node_root": str(node_root),
-                "app_url": f"http://localhost:{port}" if port else None,
-            }
-        except FileNotFoundError:
-            raise HTTPException(500, detail="Failed to execute npm/node. Ensure Node.js is installed.")
-        except Exception as e:
-            raise HTTPException(500, detail=f"Failed to start Node app: {e}")
+            return {"pid": proc.pid, "node_root": str(node_root), "app_url": app_url}
+
+        job = job_runner.submit("start", f"start {node_root.name}", work)
+        return {"ok": True, "job": job.to_dict(), "node_root": str(node_root), "app_url": app_url}
 
     # Fallback: Java
     return _start_java(port)
@@ -394,40 +603,15 @@ def start_core(
 # ==============================================================================
 # Start BOTH (host mode)
 # ==============================================================================
-PIDS_FILE = STORAGE_DIR / "pids.json"
-
-def _read_pids() -> Dict[str, int]:
-    if PIDS_FILE.exists():
-        try:
-            return json.loads(PIDS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
-
-def _write_pids(pids: Dict[str, int]) -> None:
-    PIDS_FILE.write_text(json.dumps(pids, indent=2), encoding="utf-8")
-
-def _add_pid(key: str, pid: int) -> None:
-    p = _read_pids()
-    p[key] = pid
-    _write_pids(p)
-
-def _clear_pids() -> None:
-    try:
-        PIDS_FILE.unlink(missing_ok=True)
-    except Exception:
-        pass
-
 @app.post("/core/start-both")
-def start_both(req: StartBothReq):
+async def start_both(req: StartBothReq):
     if not req.subdirs:
         raise HTTPException(400, detail="Provide at least one subdir")
     if not PROJECT_DIR.exists():
         raise HTTPException(404, detail="No project uploaded")
 
-    started: Dict[str, int] = {}
-    app_urls: Dict[str, str] = {}
-
+    # validate everything before returning the job handle
+    targets = []
     for rel in req.subdirs:
         rel = rel.strip().strip("/").replace("\\", "/")
         root = (PROJECT_DIR / rel).resolve()
@@ -435,36 +619,96 @@ def start_both(req: StartBothReq):
             raise HTTPException(400, detail=f"Invalid subdir: {rel}")
         if not (root / "package.json").exists():
             raise HTTPException(404, detail=f"package.json not found in {rel}")
+        targets.append((rel, root, _pick_node_start_command(_read_package_json(root), root)))
 
-        _ensure_node_deps(root)
-        cmd = _pick_node_start_command(_read_package_json(root), root)
-
-        try:
-            proc = subprocess.Popen(
-                cmd, cwd=str(root),
-                stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
-            )
-            started[rel] = proc.pid
-            _add_pid(rel, proc.pid)
-            if req.urls and rel in req.urls:
-                app_urls[rel] = req.urls[rel]
-        except FileNotFoundError:
-            raise HTTPException(500, detail=f"Failed to execute npm/node in {rel}. Is Node.js installed?")
-        except Exception as e:
-            raise HTTPException(500, detail=f"Failed to start {rel}: {e}")
-
-    if started:
-        first_pid = list(started.values())[0]
-        write_pid(first_pid)  # for legacy Status.running
-
-    return {"ok": True, "pids": started, "app_urls": app_urls}
+    async def work(job: Job) -> dict:
+        started: Dict[str, int] = {}
+        app_urls: Dict[str, str] = {}
+        for rel, root, cmd in targets:
+            await _ensure_node_deps(job, root)
+            try:
+                proc = subprocess.Popen(
+                    cmd, cwd=str(root),
+                    stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+                )
+                started[rel] = proc.pid
+                add_pid(rel, proc.pid, root)
+                if req.urls and rel in req.urls:
+                    app_urls[rel] = req.urls[rel]
+            except FileNotFoundError:
+                raise HTTPException(500, detail=f"Failed to execute npm/node in {rel}. Is Node.js installed?")
+            except Exception as e:
+                raise HTTPException(500, detail=f"Failed to start {rel}: {e}")
+
+        if started:
+            first_pid = list(started.values())[0]
+            write_pid(first_pid)  # for legacy Status.running
+        return {"pids": started, "app_urls": app_urls}
+
+    job = job_runner.submit("start-both", "start " + ", ".join(rel for rel, _, _ in targets), work)
+    return {"ok": True, "job": job.to_dict()}
 
 # ==============================================================================
 # Docker RUN (per-subdir)
 # ==============================================================================
-def _docker_run_for_subdir(cfg: DockerStartReq) -> Dict[str, str]:
+DOCKER_START_CONCURRENCY = 4
+
+# Dependency cache: every container shares one npm cache volume, and apps with a
+# package-lock.json get a node_modules volume named after the lockfile hash, so
+# identical lockfiles (restarts, copies of a project) install only once.
+NPM_CACHE_VOLUME = "safeai_npm_cache"
+NPM_CACHE_MOUNT = "/npm-cache"
+DEP_CACHE_PREFIX = "safeai_deps_"
+DEP_CACHE_LABEL = "safeai.dep-cache"
+DEP_CACHE_MARKER = ".safeai-installed"
+# npm ci empties node_modules, so the install lock lives on a volume of its own
+DEP_LOCK_VOLUME = "safeai_dep_locks"
+DEP_LOCK_MOUNT = "/safeai-locks"
+_CACHED_INSTALL = (
+    f"if [ -f node_modules/{DEP_CACHE_MARKER} ]; then "
+    "  echo 'node_modules restored from dependency cache'; "
+    "else "
+    f"  npm ci --prefer-offline --no-audit --no-fund && touch node_modules/{DEP_CACHE_MARKER}; "
+    "fi"
+)
+# two apps with the same lockfile may start together; flock (busybox/util-linux) serialises
+# the marker check and the install, keyed by the node_modules volume name
+_LOCKED_INSTALL = (
+    "if command -v flock >/dev/null 2>&1; "
+    "then flock \"$SAFEAI_INSTALL_LOCK\" sh -c \"$SAFEAI_INSTALL\"; "
+    "else sh -c \"$SAFEAI_INSTALL\"; fi"
+)
+
+def _dep_cache_volume(host_path: Path, image: str) -> Optional[str]:
+    lock = host_path / "package-lock.json"
+    if not lock.is_file():
+        return None
+    h = hashlib.sha256()
+    h.update(image.encode())          # native modules differ per base image
+    h.update(b"\0")
+    with lock.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return DEP_CACHE_PREFIX + h.hexdigest()[:16]
+
+def _docker_port_bindings(mappings: List[str]) -> Dict[str, object]:
+    """CLI-style "-p" values ("host:container", "ip:host:container", "container") as SDK port bindings."""
+    out: Dict[str, object] = {}
+    for m in mappings:
+        parts = m.split(":")
+        cont = parts[-1] if "/" in parts[-1] else f"{parts[-1]}/tcp"
+        if len(parts) == 1:
+            out[cont] = None                      # random host port
+        elif len(parts) == 2:
+            out[cont] = int(parts[0])
+        else:
+            out[cont] = (parts[0], int(parts[1]))
+    return out
+
+def _docker_plan(cfg: DockerStartReq) -> Dict:
     """
-    docker run -d --restart unless-stopped
+    Validate `cfg` and build the containers.run() arguments, equivalent to
+      docker run -d --restart unless-stopped
       --name <name>
       -e KEY=VALUE ...           (we set HOST/BIND/VITE_HOST=0.0.0.0 by default)
       -p host:container ...      (auto: if env PORT=n set but no -p, add n:n)
@@ -472,8 +716,6 @@ def _docker_run_for_subdir(cfg: DockerStartReq) -> Dict[str, str]:
       -v <PROJECT_DIR/subdir>:/app
       <image> sh -lc "<install> && <start>"
     """
-    _ensure_docker()
-
     # Normalize and validate subdir
     rel = cfg.subdir.strip().strip("/").replace("\\", "/")
     host_path = (PROJECT_DIR / rel).resolve()
@@ -485,27 +727,6 @@ def _docker_run_for_subdir(cfg: DockerStartReq) -> Dict[str, str]:
     # Stable, human-friendly container name from the subdir
     safe_rel = re.sub(r"[\\/]+", "_", rel)
     name = cfg.name or f"safeai_{safe_rel}"
-    docker = _docker_exe()
-
-    # --- PRE-CLEAN: remove any existing container with the same name ---
-    try:
-        probe = subprocess.run(
-            [docker, "ps", "-a", "--filter", f"name=^{name}$", "--format", "{{.ID}}"],
-            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False, text=True
-        )
-        existing_id = (probe.stdout or "").strip()
-        if existing_id:
-            subprocess.run([docker, "rm", "-f", name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            try:
-                remove_container(rel)
-            except Exception:
-                pass
-    except Exception:
-        pass
-    # -------------------------------------------------------------------
-
-    # Build base args
-    args = [docker, "run", "-d", "--restart", "unless-stopped", "--name", name]
 
     # ---- Environment defaults + port auto-map ----
     env_map = dict(cfg.env or {})
@@ -526,52 +747,117 @@ def _docker_run_for_subdir(cfg: DockerStartReq) -> Dict[str, str]:
                 auto_ports.append(f"{p}:{p}")
         except Exception:
             pass
+    try:
+        port_bindings = _docker_port_bindings(auto_ports)
+    except ValueError:
+        raise HTTPException(400, detail=f"Invalid port mapping in {cfg.subdir}: {auto_ports}")
+
+    install = cfg.install
+    volumes = {str(host_path): {"bind": cfg.workdir, "mode": "rw"}}
+    cache_volumes: List[str] = []
+    if cfg.dep_cache:
+        env_map.setdefault("npm_config_cache", NPM_CACHE_MOUNT)
+        volumes[NPM_CACHE_VOLUME] = {"bind": NPM_CACHE_MOUNT, "mode": "rw"}
+        cache_volumes.append(NPM_CACHE_VOLUME)
+        deps_volume = _dep_cache_volume(host_path, cfg.image)
+        # only take over the default install; a custom one may expect the host's node_modules
+        if deps_volume and cfg.install == DockerStartReq.model_fields["install"].default:
+            volumes[deps_volume] = {"bind": f"{cfg.workdir.rstrip('/')}/node_modules", "mode": "rw"}
+            volumes[DEP_LOCK_VOLUME] = {"bind": DEP_LOCK_MOUNT, "mode": "rw"}
+            cache_volumes += [deps_volume, DEP_LOCK_VOLUME]
+            env_map["SAFEAI_INSTALL"] = _CACHED_INSTALL
+            env_map["SAFEAI_INSTALL_LOCK"] = f"{DEP_LOCK_MOUNT}/{deps_volume}.lock"
+            install = _LOCKED_INSTALL
+
+    run_kwargs = {
+        "image": cfg.image,
+        "command": ["sh", "-lc", f"{install} && {cfg.start}"],
+        "name": name,
+        "detach": True,
+        "restart_policy": {"Name": "unless-stopped"},
+        "environment": env_map,
+        "ports": port_bindings,
+        "working_dir": cfg.workdir,
+        "volumes": volumes,
+    }
+    return {"rel": rel, "name": name, "run_kwargs": run_kwargs, "ports": auto_ports,
+            "image": cfg.image, "workdir": cfg.workdir, "subdir": cfg.subdir,
+            "cache_volumes": cache_volumes}
+
+def _docker_run_blocking(plan: Dict) -> Dict[str, str]:
+    """Replace any container with the same name and start a new one (Docker SDK, blocking)."""
+    rel, name = plan["rel"], plan["name"]
+    run_id = build_log.start_run(f"DOCKER: run {name} ({plan['image']}) for {rel}")
+    rc = 1
+    try:
+        # --- PRE-CLEAN: remove any existing container with the same name ---
+        for old in containers_named(name):
+            old.remove(force=True)
+            try:
+                remove_container(rel)
+            except Exception:
+                pass
+        # -------------------------------------------------------------------
+        for vol in plan["cache_volumes"]:
+            # creating an existing volume is a no-op; this just attaches the label for prune
+            docker_client.volumes.create(name=vol, labels={DEP_CACHE_LABEL: "1"})
+        container = docker_client.containers.run(**plan["run_kwargs"])
+        build_log.write(f"{container.id}\n")
+        rc = 0
+    except Exception as e:
+        build_log.write(f"{e}\n")
+        raise HTTPException(500, detail=f"Docker failed to run {plan['subdir']}: {e}")
+    finally:
+        build_log.end_run(run_id, rc)
 
-    # Apply envs
-    for k, v in env_map.items():
-        args += ["-e", f"{k}={v}"]
+    add_container(rel, container.id, info={
+        "name": name,
+        "image": plan["image"],
+        "ports": plan["ports"],
+        "workdir": plan["workdir"]
+    })
+    return {"id": container.id, "name": name}
 
-    # Apply port mappings (now that auto_ports is finalized)
-    for p in auto_ports:
-        args += ["-p", p]
+async def _docker_start_all(job: Job, plans: List[Dict]) -> Dict[str, Dict]:
+    """Start every planned app concurrently (bounded); per-app result or error."""
+    await asyncio.to_thread(_ensure_docker)
+    sem = asyncio.Semaphore(DOCKER_START_CONCURRENCY)
 
-    # Workdir + bind mount
-    args += ["-w", cfg.workdir, "-v", f"{str(host_path)}:{cfg.workdir}"]
+    async def one(plan: Dict) -> Dict:
+        async with sem:
+            started = time.perf_counter()
+            try:
+                res = await asyncio.to_thread(_docker_run_blocking, plan)
+                return {"ok": True, **res, "seconds": round(time.perf_counter() - started, 3)}
+            except HTTPException as e:
+                return {"ok": False, "error": e.detail}
 
-    # Image + command (install then start)
-    cmd = f"{cfg.install} && {cfg.start}"
-    args += [cfg.image, "sh", "-lc", cmd]
+    results = await asyncio.gather(*(one(p) for p in plans))
+    return {p["subdir"]: r for p, r in zip(plans, results)}
 
-    _append_log(f"DOCKER: {' '.join(args)}")
-    proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False, text=True)
-    out = (proc.stdout or "").strip()
-    with BUILD_LOG.open("a", encoding="utf-8") as f:
-        f.write(out + "\n")
+@app.post("/core/docker/start", summary="Run ONE uploaded subdir inside a Docker container")
+async def docker_start(cfg: DockerStartReq):
+    plan = _docker_plan(cfg)
 
-    if proc.returncode != 0 or not out:
-        raise HTTPException(500, detail=f"Docker failed to run {cfg.subdir}: {out or proc.returncode}")
+    async def work(job: Job) -> dict:
+        res = (await _docker_start_all(job, [plan]))[plan["subdir"]]
+        if not res["ok"]:
+            raise HTTPException(500, detail=res["error"])
+        return {"container": res}
 
-    container_id = out.splitlines()[-1].strip()  # docker prints the new id on success
-    add_container(rel, container_id, info={
-        "name": name,
-        "image": cfg.image,
-        "ports": auto_ports,
-        "workdir": cfg.workdir
-    })
-    return {"id": container_id, "name": name}
-
-@app.post("/core/docker/start", summary="Run ONE uploaded subdir inside a Docker container")
-def docker_start(cfg: DockerStartReq):
-    res = _docker_run_for_subdir(cfg)
-    return {"ok": True, "container": res}
+    job = job_runner.submit("docker-start", f"docker run {plan['rel']}", work)
+    return {"ok": True, "job": job.to_dict()}
 
 @app.post("/core/docker/start-both", summary="Run MANY uploaded subdirs inside Docker containers")
-def docker_start_many(req: DockerStartManyReq):
-    started = {}
-    for app_cfg in req.apps:
-        res = _docker_run_for_subdir(app_cfg)
-        started[app_cfg.subdir] = res
-    return {"ok": True, "containers": started}
+async def docker_start_many(req: DockerStartManyReq):
+    plans = [_docker_plan(app_cfg) for app_cfg in req.apps]
+
+    async def work(job: Job) -> dict:
+        results = await _docker_start_all(job, plans)
+        return {"ok": all(r["ok"] for r in results.values()), "containers": results}
+
+    job = job_runner.submit("docker-start", "docker run " + ", ".join(p["rel"] for p in plans), work)
+    return {"ok": True, "job": job.to_dict()}
 
 @app.get("/core/docker/containers")
 def docker_containers():
@@ -601,34 +887,63 @@ def docker_urls():
         out[rel] = _ports_to_urls(ports)
     return {"urls": out}
 
+@app.get("/core/docker/dep-cache", summary="List dependency cache volumes")
+def docker_dep_cache():
+    _ensure_docker()
+    vols = docker_client.volumes.list(filters={"label": DEP_CACHE_LABEL})
+    return {"volumes": sorted(v.name for v in vols)}
+
+@app.post("/core/docker/dep-cache/prune", summary="Remove dependency cache volumes no container uses")
+def docker_dep_cache_prune():
+    _ensure_docker()
+    res = docker_client.volumes.prune(filters={"label": DEP_CACHE_LABEL})
+    return {"ok": True, "removed": res.get("VolumesDeleted") or [], "reclaimed": res.get("SpaceReclaimed", 0)}
+
+def _docker_remove(cid: str) -> None:
+    try:
+        c = docker_client.containers.get(cid)
+    except docker_errors.NotFound:
+        return
+    try:
+        c.stop()
+    except Exception:
+        pass
+    c.remove(force=True)
+
 @app.post("/core/docker/stop", summary="Stop & remove ONE container by subdir")
 def docker_stop(subdir: str = Query(..., description="The subdir key you used when starting")):
     _ensure_docker()
     rel = subdir.strip().strip("/").replace("\\", "/")
-    rec = read_containers().get(rel)
+    rec = get_container(rel)
     if not rec:
         raise HTTPException(404, detail=f"No container recorded for {rel}")
     cid = rec.get("id")
     if not cid:
         raise HTTPException(404, detail=f"No container id stored for {rel}")
-    docker = _docker_exe()
-    subprocess.run([docker, "stop", cid], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    subprocess.run([docker, "rm", "-f", cid], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _docker_remove(cid)
+    except Exception as e:
+        raise HTTPException(500, detail=f"Failed to remove container for {rel}: {e}")
     remove_container(rel)
     return {"ok": True, "stopped": rel, "id": cid}
 
 @app.post("/core/docker/stop-all", summary="Stop & remove ALL recorded containers")
 def docker_stop_all():
     _ensure_docker()
-    docker = _docker_exe()
     data = read_containers()
-    for rel, rec in list(data.items()):
-        cid = (rec or {}).get("id")
-        if not cid:
-            continue
-        subprocess.run([docker, "stop", cid], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        subprocess.run([docker, "rm", "-f", cid], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    targets = [(rel, (rec or {}).get("id")) for rel, rec in data.items() if (rec or {}).get("id")]
+
+    def one(target):
+        rel, cid = target
+        try:
+            _docker_remove(cid)
+        except Exception:
+            return
         remove_container(rel)
+
+    # `docker stop` waits for each container to exit, so stop them side by side
+    with ThreadPoolExecutor(max_workers=DOCKER_START_CONCURRENCY) as pool:
+        list(pool.map(one, targets))
     return {"ok": True, "message": "All containers stopped/removed."}
 
 # ==============================================================================
@@ -637,19 +952,10 @@ def docker_stop_all():
 @app.post("/core/stop")
 def stop_core():
     # Kill multi-PIDs
-    pids_file = STORAGE_DIR / "pids.json"
-    if pids_file.exists():
-        try:
-            pids = json.loads(pids_file.read_text(encoding="utf-8"))
-        except Exception:
-            pids = {}
-    else:
-        pids = {}
-
-    for key, pid in list(pids.items()):
+    for key, rec in read_pids().items():
         try:
             import psutil
-            p = psutil.Process(pid)
+            p = psutil.Process(rec["pid"])
             p.terminate()
             try:
                 p.wait(timeout=8)
@@ -657,10 +963,7 @@ def stop_core():
                 p.kill()
         except Exception:
             pass
-    try:
-        pids_file.unlink(missing_ok=True)
-    except Exception:
-        pass
+    clear_pids()
 
     # Kill legacy single PID
     pid = read_pid()
@@ -697,17 +1000,20 @@ def core_delete(
 
     if target.is_file():
         target.unlink(missing_ok=True)
+        project_index.remove_path(target)
         return {"ok": True, "deleted": path, "type": "file"}
 
     try:
         if recursive:
             shutil.rmtree(target)
+            project_index.remove_path(target)
         else:
             next(target.iterdir())  # raises StopIteration if empty
             raise HTTPException(400, detail="Directory not empty. Use recursive=true.")
         return {"ok": True, "deleted": path, "type": "dir", "recursive": recursive}
     except StopIteration:
         target.rmdir()
+        project_index.remove_path(target)
         return {"ok": True, "deleted": path, "type": "dir", "recursive": False}
 
 @app.post("/core/reset")
@@ -726,6 +1032,7 @@ def core_reset():
 
     # Clear uploaded project
     reset_project_dir()
+    clear_manifest()
 
     # Remove legacy artifacts
     try: JAR_FILE.unlink(missing_ok=True)
@@ -743,6 +1050,37 @@ def core_reset():
 # ==============================================================================
 
 app.include_router(plugins_router, prefix="/core/plugins", tags=["plugins"])
+app.include_router(uploads_router, prefix="/core/uploads", tags=["uploads"])
+
+@app.on_event("startup")
+async def _start_plugin_pool():
+    # pool and batch-shard runners of a previous process are not tracked anymore
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, warm_pool.remove_orphans)
+    loop.run_in_executor(None, remove_labelled_containers, BATCH_SHARD_LABEL)
+
+@app.on_event("shutdown")
+async def _stop_plugin_pool():
+    await close_plugin_http_client()
+    await asyncio.to_thread(warm_pool.shutdown)
+    plugin_instances.shutdown()
+
+# ==============================================================================
+# Project index watcher (optional: picks up edits made outside this API)
+# ==============================================================================
+_index_watch_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def _start_index_watch():
+    global _index_watch_task
+    if os.environ.get("CORE_INDEX_WATCH") == "1":
+        _index_watch_task = asyncio.create_task(watch_project(project_index))
+
+@app.on_event("shutdown")
+async def _stop_index_watch():
+    if _index_watch_task is not None:
+        _index_watch_task.cancel()
+        project_index.wake_watcher()  # lets the awatch thread exit
 
 @app.get("/healthz")
 def healthz():
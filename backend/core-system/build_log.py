@@ -0,0 +1,197 @@
+# SAFE-AI-FRAMEWORK/backend/build_log.py
+"""
+Build log store.
+
+Everything the loader runs (npm, docker, java) is appended to STORAGE_DIR/build.log
+through one persistent handle. Positions are global byte offsets that keep
+growing across size-based rotation (build.log -> build.log.1 -> ...), so a
+client can resume a stream from the last offset it saw. Every command is a
+"run" with its own start/end offsets and exit code, kept in build.log.index.json.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from process_registry import STORAGE_DIR
+
+BUILD_LOG = STORAGE_DIR / "build.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+MAX_RUNS = 200
+
+class BuildLog:
+    def __init__(self, path: Path, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        self.path = path
+        self.index_path = path.with_name(path.name + ".index.json")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.RLock()
+        self._fh = None
+        # global offset of the first byte of each file: {"build.log": n, "build.log.1": m, ...}
+        self._bases: Dict[str, int] = {}
+        self._runs: List[Dict] = []
+        self._next_run = 1
+        self._end = 0
+        self._load_index()
+
+    # -------------------------------------------------------------------------
+    # Index + handle
+    # -------------------------------------------------------------------------
+    def _load_index(self) -> None:
+        data = {}
+        if self.index_path.exists():
+            try:
+                data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except Exception:
+                data = {}
+        self._bases = data.get("bases") or {}
+        self._bases.setdefault(self.path.name, 0)
+        self._runs = data.get("runs") or []
+        self._next_run = max((r["id"] for r in self._runs), default=0) + 1
+        size = self.path.stat().st_size if self.path.exists() else 0
+        self._end = self._bases.get(self.path.name, 0) + size
+        # runs that never finished belong to a previous process
+        for r in self._runs:
+            if r.get("end") is None:
+                r["end"] = self._end
+                r["status"] = "interrupted"
+
+    def _save_index(self) -> None:
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps({"bases": self._bases, "runs": self._runs[-MAX_RUNS:]}), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def _handle(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.path.open("ab")
+        return self._fh
+
+    def _rotate(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        names = [self.path.name] + [f"{self.path.name}.{i}" for i in range(1, self.backups + 1)]
+        oldest = self.path.with_name(names[-1])
+        oldest.unlink(missing_ok=True)
+        self._bases.pop(names[-1], None)
+        for newer, older in zip(reversed(names[:-1]), reversed(names[1:])):
+            src = self.path.with_name(newer)
+            if src.exists():
+                os.replace(src, self.path.with_name(older))
+                self._bases[older] = self._bases.get(newer, 0)
+            else:
+                self._bases.pop(older, None)
+        self._bases[self.path.name] = self._end
+        self._save_index()
+
+    # -------------------------------------------------------------------------
+    # Writing
+    # -------------------------------------------------------------------------
+    @property
+    def end(self) -> int:
+        """Global offset just past the last byte written."""
+        return self._end
+
+    def write(self, text: str) -> int:
+        data = text.encode("utf-8", errors="replace")
+        with self._lock:
+            if self._end - self._bases.get(self.path.name, 0) >= self.max_bytes:
+                self._rotate()
+            fh = self._handle()
+            fh.write(data)
+            fh.flush()
+            self._end += len(data)
+            return self._end
+
+    def append(self, msg: str) -> None:
+        self.write(f"[{datetime.now().isoformat(timespec='seconds')}] {msg}\n")
+
+    def start_run(self, label: str) -> int:
+        with self._lock:
+            run = {"id": self._next_run, "label": label, "start": self._end, "end": None,
+                   "status": "running", "exit_code": None, "started_at": time.time()}
+            self._next_run += 1
+            self._runs.append(run)
+            del self._runs[:-MAX_RUNS]
+            self._save_index()
+        self.append(f"RUN: {label}")
+        return run["id"]
+
+    def end_run(self, run_id: int, exit_code: int) -> None:
+        self.append(f"EXIT: {exit_code}")
+        with self._lock:
+            run = self.get_run(run_id)
+            if run is not None:
+                run.update(end=self._end, exit_code=exit_code, finished_at=time.time(),
+                           status="succeeded" if exit_code == 0 else "failed")
+                self._save_index()
+
+    # -------------------------------------------------------------------------
+    # Reading
+    # -------------------------------------------------------------------------
+    def runs(self) -> List[Dict]:
+        with self._lock:
+            return [dict(r) for r in self._runs]
+
+    def get_run(self, run_id: int) -> Optional[Dict]:
+        with self._lock:
+            for r in self._runs:
+                if r["id"] == run_id:
+                    return r
+        return None
+
+    def first_offset(self) -> int:
+        with self._lock:
+            return min(self._bases.values(), default=0)
+
+    def read(self, offset: int, max_bytes: int = 64 * 1024) -> Tuple[bytes, int]:
+        """
+        Up to `max_bytes` starting at global `offset` (clamped to what is still
+        on disk). Returns (data, next_offset); reads stop at file boundaries.
+        """
+        # held so a rotation can't rename files between lookup and read
+        with self._lock:
+            end = self._end
+            segments = sorted(((base, name) for name, base in self._bases.items()), reverse=True)
+            offset = max(offset, segments[-1][0])
+            if offset >= end:
+                return b"", end
+            for base, name in segments:
+                if offset >= base:
+                    try:
+                        with self.path.with_name(name).open("rb") as f:
+                            f.seek(offset - base)
+                            data = f.read(min(max_bytes, end - offset))
+                    except OSError:
+                        return b"", end
+                    return data, offset + len(data)
+            return b"", end
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """Bytes between two global offsets, across rotated files."""
+        parts = []
+        while start < end:
+            data, start = self.read(start, end - start)
+            if not data:
+                break
+            parts.append(data)
+        return b"".join(parts)
+
+    def tail(self, max_bytes: int) -> str:
+        end = self._end
+        start = max(end - max_bytes, self.first_offset())
+        return self.read_range(start, end).decode("utf-8", errors="ignore")
+
+def split_lines(buf: bytes) -> Tuple[List[bytes], bytes]:
+    """Complete lines in `buf` and the unterminated rest, to keep for the next read."""
+    idx = buf.rfind(b"\n")
+    if idx < 0:
+        return [], buf
+    return buf[:idx].split(b"\n"), buf[idx + 1:]
+
+build_log = BuildLog(BUILD_LOG)
@@ -0,0 +1,77 @@
+# SAFE-AI-FRAMEWORK/backend/file_access.py
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+READ_CHUNK = 1024 * 1024
+LINE_INDEX_CACHE_ENTRIES = 16
+
+def file_etag(st: os.stat_result) -> str:
+    """Validator for a file version; changes whenever size or mtime change."""
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+# -----------------------------------------------------------------------------
+# Newline index: byte offset of every line start, so a window of lines is one
+# seek + one read instead of decoding the whole file.
+# -----------------------------------------------------------------------------
+def _scan_line_starts(path: Path) -> array:
+    starts = array("Q", [0])
+    pos = 0
+    with path.open("rb") as f:
+        while chunk := f.read(READ_CHUNK):
+            i = chunk.find(b"\n")
+            while i != -1:
+                starts.append(pos + i + 1)
+                i = chunk.find(b"\n", i + 1)
+            pos += len(chunk)
+    # a trailing newline does not start another line
+    if len(starts) > 1 and starts[-1] == pos:
+        starts.pop()
+    return starts
+
+class LineIndexCache:
+    """LRU of newline indexes keyed by path, valid while size+mtime are unchanged."""
+
+    def __init__(self, max_entries: int = LINE_INDEX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, Tuple[int, int, array]]" = OrderedDict()
+
+    def get(self, path: Path, st: os.stat_result) -> array:
+        key = str(path)
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+                self._data.move_to_end(key)
+                return hit[2]
+        starts = _scan_line_starts(path)
+        with self._lock:
+            self._data[key] = (st.st_size, st.st_mtime_ns, starts)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return starts
+
+line_index = LineIndexCache()
+
+def read_line_window(path: Path, st: os.stat_result, offset: int, limit: int) -> Tuple[str, int]:
+    """Lines [offset, offset + limit) of `path` as text, plus the file's total line count."""
+    starts = line_index.get(path, st)
+    total = len(starts) if st.st_size else 0
+    if offset >= total:
+        return "", total
+    begin = starts[offset]
+    end = starts[offset + limit] if offset + limit < total else st.st_size
+    with path.open("rb") as f:
+        f.seek(begin)
+        data = f.read(end - begin)
+    return data.decode("utf-8", errors="ignore"), total
@@ -0,0 +1,228 @@
+# SAFE-AI-FRAMEWORK/backend/job_runner.py
+"""
+Background jobs for long operations (npm install, docker run, ...).
+
+An endpoint submits a coroutine and returns the job handle right away; the
+client polls /core/jobs/{id} (or follows the job's build-log runs over SSE)
+and may cancel it. Commands run through asyncio subprocesses, so a 30 minute
+`npm ci` no longer pins a worker thread.
+"""
+import asyncio
+import codecs
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from build_log import build_log
+
+MAX_JOBS = 200
+READ_CHUNK = 64 * 1024
+OUTPUT_TAIL_CHARS = 16 * 1024
+
+class Job:
+    def __init__(self, kind: str, label: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.status = "queued"            # queued | running | succeeded | failed | timeout | cancelled
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.runs: List[int] = []          # build-log run ids, see /core/build-log/stream?run=
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished is not None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error,
+            "runs": list(self.runs),
+        }
+
+class JobRunner:
+    def __init__(self, max_jobs: int = MAX_JOBS):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    # -------------------------------------------------------------------------
+    # Jobs
+    # -------------------------------------------------------------------------
+    def submit(
+        self,
+        kind: str,
+        label: str,
+        work: Callable[[Job], Awaitable[Optional[dict]]],
+        timeout: Optional[float] = None,
+    ) -> Job:
+        """Start `work(job)` in the background; must be called from the event loop."""
+        job = Job(kind, label)
+        self._jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._execute(job, work, timeout))
+        return job
+
+    async def _execute(self, job: Job, work, timeout: Optional[float]) -> None:
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = await asyncio.wait_for(work(job), timeout)
+            job.status = "succeeded"
+        except asyncio.TimeoutError:
+            job.status = "timeout"
+            job.error = f"Timed out after {timeout:.0f}s"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except HTTPException as e:
+            job.status = "failed"
+            job.error = e.detail if isinstance(e.detail, str) else str(e.detail)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+        finally:
+            job.finished = time.time()
+
+    def _prune(self) -> None:
+        # drop the oldest finished jobs; running ones are always kept
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in [j.id for j in self._jobs.values() if j.done][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.done or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    async def shutdown(self) -> None:
+        tasks = [j.task for j in self._jobs.values() if j.task is not None and not j.done]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # -------------------------------------------------------------------------
+    # Commands
+    # -------------------------------------------------------------------------
+    async def run_command(
+        self,
+        job: Optional[Job],
+        cmd: List[str],
+        cwd: Optional[Path] = None,
+        timeout: Optional[float] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, str]:
+        """
+        Run `cmd`, streaming its output into the build log as a run of `job`.
+        Returns (exit code, tail of the output); 124 on timeout. Cancelling the
+        caller kills the process.
+        """
+        run_id = build_log.start_run(f"{' '.join(cmd)} (cwd={cwd})")
+        if job is not None:
+            job.runs.append(run_id)
+        tail: List[str] = []
+        rc = 1
+        try:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, cwd=str(cwd) if cwd else None, env=env,
+                    stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                )
+            except NotImplementedError:
+                # event loop without subprocess support (selector loop on Windows)
+                rc = await asyncio.to_thread(_run_blocking, cmd, cwd, timeout, env, tail)
+                return rc, "".join(tail)[-OUTPUT_TAIL_CHARS:]
+            except Exception as e:
+                build_log.append(f"ERROR: {e}")
+                return rc, str(e)
+
+            async def pump() -> int:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+                while chunk := await proc.stdout.read(READ_CHUNK):
+                    _log_output(decoder.decode(chunk), tail)
+                return await proc.wait()
+
+            try:
+                rc = await asyncio.wait_for(pump(), timeout)
+            except asyncio.TimeoutError:
+                _kill(proc)
+                await proc.wait()
+                build_log.append("TIMEOUT")
+                rc = 124
+            except asyncio.CancelledError:
+                _kill(proc)
+                await proc.wait()
+                build_log.append("CANCELLED")
+                rc = 130
+                raise
+            return rc, "".join(tail)[-OUTPUT_TAIL_CHARS:]
+        finally:
+            build_log.end_run(run_id, rc)
+
+def _kill(proc) -> None:
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+def _log_output(text: str, tail: List[str]) -> None:
+    if not text:
+        return
+    build_log.write(text)
+    tail.append(text)
+    while len(tail) > 1 and sum(map(len, tail)) > OUTPUT_TAIL_CHARS * 2:
+        tail.pop(0)
+
+def _run_blocking(cmd: List[str], cwd: Optional[Path], timeout: Optional[float], env, tail: List[str]) -> int:
+    try:
+        proc = subprocess.Popen(cmd, cwd=str(cwd) if cwd else None, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except Exception as e:
+        build_log.append(f"ERROR: {e}")
+        return 1
+    timed_out = threading.Event()
+
+    def _expire():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(timeout, _expire) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        while chunk := proc.stdout.read1(READ_CHUNK):
+            _log_output(decoder.decode(chunk), tail)
+        rc = proc.wait()
+    finally:
+        if timer:
+            timer.cancel()
+    if timed_out.is_set():
+        build_log.append("TIMEOUT")
+        return 124
+    return rc
+
+job_runner = JobRunner()
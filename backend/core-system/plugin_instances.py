@@ -0,0 +1,155 @@
+# SAFE-AI-FRAMEWORK/backend/plugin_instances.py
+"""
+In-memory registry of running plugin containers (name -> id, state, host port).
+
+Entries are only trusted while the Docker events stream is connected: any
+lifecycle event for a cached container drops its entry (a restart publishes
+a new host port), and losing the stream clears everything. With a warm cache
+the /run path needs no Docker API call at all.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# events after which the cached state (or port) of a container is no longer valid
+INVALIDATING_ACTIONS = {
+    "create", "start", "restart", "stop", "die", "kill", "oom",
+    "pause", "unpause", "rename", "destroy",
+}
+# events after which the container can't serve requests any more
+GONE_ACTIONS = {"stop", "die", "kill", "oom", "pause", "destroy"}
+RECENT_EVENTS = 1024
+RECONNECT_MAX_SECONDS = 30
+
+class PluginInstance:
+    def __init__(self, name: str, container, host_port: str):
+        self.name = name
+        self.container = container
+        self.container_id = container.id
+        self.status = "running"
+        self.host_port = host_port
+        self.cached_at = time.time()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.host_port}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "id": self.container_id,
+            "status": self.status,
+            "host_port": self.host_port,
+            "cached_at": self.cached_at,
+        }
+
+class PluginInstanceRegistry:
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._by_name: Dict[str, PluginInstance] = {}
+        self._seq = 0
+        # container id -> seq of the last event seen for it, for ids not cached yet
+        self._recent: "OrderedDict[str, int]" = OrderedDict()
+        self._listeners: List[Callable[[str], None]] = []
+        self._live = threading.Event()
+        self._stop = threading.Event()
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -------------------------------------------------------------------------
+    # Cache
+    # -------------------------------------------------------------------------
+    def token(self) -> int:
+        """Take before asking Docker about a container; pass to put()."""
+        self._ensure_watching()
+        with self._lock:
+            return self._seq
+
+    def get(self, name: str) -> Optional[PluginInstance]:
+        if not self._live.is_set():
+            return None
+        with self._lock:
+            return self._by_name.get(name)
+
+    def put(self, name: str, container, host_port: str, token: int) -> None:
+        """Cache `name` unless an event for it arrived since `token` was taken."""
+        with self._lock:
+            if not self._live.is_set() or self._recent.get(container.id, -1) > token:
+                return
+            self._by_name[name] = PluginInstance(name, container, host_port)
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            self._by_name.pop(name, None)
+
+    def instances(self) -> List[dict]:
+        with self._lock:
+            return [i.to_dict() for i in self._by_name.values()]
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """`callback(container_id)` runs (on the events thread) when a container stops being usable."""
+        self._listeners.append(callback)
+
+    # -------------------------------------------------------------------------
+    # Docker events
+    # -------------------------------------------------------------------------
+    def _ensure_watching(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._watch, name="plugin-events", daemon=True)
+                    self._thread.start()
+
+    def _watch(self) -> None:
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._stream = self.client.events(decode=True, filters={"type": "container"})
+                self._live.set()
+                delay = 1.0
+                for event in self._stream:
+                    self._handle(event)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"[plugin-events] stream lost: {e}")
+            # anything may have happened while we weren't listening
+            self._live.clear()
+            with self._lock:
+                self._by_name.clear()
+            if self._stop.wait(delay):
+                break
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+    def _handle(self, event: dict) -> None:
+        action = (event.get("Action") or event.get("status") or "").split(":", 1)[0]
+        if action not in INVALIDATING_ACTIONS:
+            return
+        cid = (event.get("Actor") or {}).get("ID") or event.get("id")
+        if not cid:
+            return
+        with self._lock:
+            self._seq += 1
+            self._recent[cid] = self._seq
+            self._recent.move_to_end(cid)
+            while len(self._recent) > RECENT_EVENTS:
+                self._recent.popitem(last=False)
+            for name in [n for n, i in self._by_name.items() if i.container_id == cid]:
+                del self._by_name[name]
+        if action in GONE_ACTIONS:
+            for callback in self._listeners:
+                try:
+                    callback(cid)
+                except Exception:
+                    pass
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._live.clear()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
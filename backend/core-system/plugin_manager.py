@@ -1,13 +1,25 @@
+import json
 import re
+import time
 import uuid
 from pathlib import Path
 import docker
+import requests
+
+from plugin_instances import PluginInstance, PluginInstanceRegistry
 
 docker_client = docker.from_env()
+plugin_instances = PluginInstanceRegistry(docker_client)
 
 PLUGINS_ROOT = (Path(__file__).resolve().parents[1] / "storage" / "core_project" / "ai_plugins").resolve()
 SLUG_RE = re.compile(r"^[A-Za-z0-9._-]+$")
 
+_manifests: dict = {}   # manifest path -> (mtime_ns, data)
+
+READY_TIMEOUT_SECONDS = 15.0
+PLUGIN_LABEL = "safeai.plugin"             # on every runner container; value = slug
+BATCH_SHARD_LABEL = "safeai.batch-shard"   # extra runners started for one run-batch
+
 
 def _sanitize_slug(slug: str) -> str:
     if not SLUG_RE.match(slug or ""):
@@ -24,11 +36,41 @@ def _plugin_folder(slug: str) -> Path:
     return p
 
 
+def containers_named(name: str) -> list:
+    """Containers (running or not) named exactly `name`."""
+    # the name filter is an unanchored regex matched against "/<name>";
+    # without anchors plugin_x would also match plugin_x_<id>
+    return docker_client.containers.list(all=True, filters={"name": f"^/{re.escape(name)}$"})
+
+
 def _find_existing_container(name: str):
-    lst = docker_client.containers.list(all=True, filters={"name": name})
+    lst = containers_named(name)
     return lst[0] if lst else None
 
 
+def run_plugin_container(slug: str, name: str, mem_limit: str = "512m", labels: dict | None = None):
+    """Create and start a runner container for `slug` (its folder mounted read-only)."""
+    folder = _plugin_folder(_sanitize_slug(slug))
+
+    volumes = {
+        str(folder): {"bind": "/plugin", "mode": "ro"}
+    }
+
+    # publish container 9000 to a random host port
+    ports = {"9000/tcp": None}
+
+    return docker_client.containers.run(
+        image="ai-plugin-runner:1",
+        name=name,
+        detach=True,
+        environment={"PLUGIN_DIR": "/plugin", "ENTRY": "entry.js", "TIMEOUT_MS": "8000"},
+        volumes=volumes,
+        ports=ports,
+        mem_limit=mem_limit,
+        labels={PLUGIN_LABEL: slug, **(labels or {})},
+    )
+
+
 def start_plugin_container(
     slug: str,
     reuse: bool = True,
@@ -37,46 +79,83 @@ def start_plugin_container(
 ):
     """
     reuse=True  -> one long-lived container per slug
-    reuse=False -> new container each call
+    reuse=False -> new container each call (a named instance_id is reused while it exists)
     """
     slug = _sanitize_slug(slug)
-    folder = _plugin_folder(slug)
+    _plugin_folder(slug)
 
     base_name = f"plugin_{slug}"
     name = base_name if reuse else f"{base_name}_{instance_id or uuid.uuid4().hex[:8]}"
 
-    if reuse:
-        existing = _find_existing_container(base_name)
+    if reuse or instance_id:
+        existing = _find_existing_container(name)
         if existing:
             existing.reload()
             if existing.status != "running":
                 existing.start()
             return existing
 
+    return run_plugin_container(slug, name, mem_limit)
 
-    volumes = {
-        str(folder): {"bind": "/plugin", "mode": "ro"}
-    }
 
-    # publish container 9000 to a random host port
-    ports = {"9000/tcp": None}
+def _instance_name(slug: str, reuse: bool, instance_id: str | None) -> str | None:
+    if reuse:
+        return f"plugin_{slug}"
+    return f"plugin_{slug}_{instance_id}" if instance_id else None
 
-    container = docker_client.containers.run(
-        image="ai-plugin-runner:1",
-        name=name,
-        detach=True,
-        environment={"PLUGIN_DIR": "/plugin", "ENTRY": "entry.js", "TIMEOUT_MS": "8000"},
-        volumes=volumes,
-        ports=ports,
-        mem_limit=mem_limit
-    )
 
-    return container
+def cached_plugin_instance(slug: str, reuse: bool = True, instance_id: str | None = None) -> PluginInstance | None:
+    """The registry entry for this instance, if any (never calls Docker)."""
+    name = _instance_name(_sanitize_slug(slug), reuse, instance_id)
+    return plugin_instances.get(name) if name else None
+
+
+def plugin_manifest(slug: str) -> dict:
+    """manifest.json of the plugin ({} if missing or unreadable), cached by mtime."""
+    mf = _plugin_folder(_sanitize_slug(slug)) / "manifest.json"
+    try:
+        mtime = mf.stat().st_mtime_ns
+    except OSError:
+        return {}
+    hit = _manifests.get(mf)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    try:
+        data = json.loads(mf.read_text(encoding="utf-8"))
+    except Exception:
+        data = {}
+    _manifests[mf] = (mtime, data if isinstance(data, dict) else {})
+    return _manifests[mf][1]
+
+
+def ensure_plugin_instance(
+    slug: str,
+    reuse: bool = True,
+    instance_id: str | None = None,
+    mem_limit: str = "512m"
+) -> PluginInstance:
+    """
+    Like start_plugin_container, but answers from the instance registry when
+    the container is known to be running (no Docker call on a cache hit).
+    """
+    slug = _sanitize_slug(slug)
+    name = _instance_name(slug, reuse, instance_id)
+    cached = plugin_instances.get(name) if name else None
+    if cached is not None:
+        return cached
+
+    token = plugin_instances.token()
+    c = start_plugin_container(slug, reuse=reuse, instance_id=instance_id, mem_limit=mem_limit)
+    host_port = get_plugin_host_port(c)
+    if name is not None:
+        plugin_instances.put(name, c, host_port, token)
+    return PluginInstance(c.name, c, host_port)
 
 
 def stop_plugin_container(slug: str, instance_id: str | None = None) -> bool:
     base = f"plugin_{_sanitize_slug(slug)}"
     name = base if not instance_id else f"{base}_{instance_id}"
+    plugin_instances.invalidate(name)
     c = _find_existing_container(name)
     if not c:
         return False
@@ -91,6 +170,81 @@ def stop_plugin_container(slug: str, instance_id: str | None = None) -> bool:
     return True
 
 
+def reload_plugin(slug: str, force: bool = False) -> list[dict]:
+    """
+    Ask every running runner of `slug` (long-lived, named and pooled) to
+    re-check its plugin files now instead of at its next poll. force=True
+    re-imports the entry even if nothing changed.
+    """
+    slug = _sanitize_slug(slug)
+    found = {c.id: c for c in docker_client.containers.list(filters={"label": f"{PLUGIN_LABEL}={slug}"})}
+    # the long-lived runner may predate the label
+    legacy = _find_existing_container(f"plugin_{slug}")
+    if legacy is not None and legacy.status == "running":
+        found.setdefault(legacy.id, legacy)
+    out = []
+    for c in found.values():
+        res = {"name": c.name}
+        try:
+            r = requests.post(f"http://127.0.0.1:{get_plugin_host_port(c)}/reload", json={"force": force}, timeout=30)
+            data = r.json()
+            res.update(ok=bool(data.get("ok")), reloaded=data.get("reloaded"), version=data.get("version"))
+            if not data.get("ok"):
+                res["error"] = data.get("error")
+        except Exception as e:
+            res.update(ok=False, error=str(e))
+        out.append(res)
+    return out
+
+
+def start_batch_shard(slug: str, shard_id: str, mem_limit: str = "512m") -> PluginInstance:
+    """
+    An extra runner for one batch. It is labelled so the batch can remove it
+    afterwards and leftovers of a crashed process are removed on startup.
+    """
+    slug = _sanitize_slug(slug)
+    c = run_plugin_container(slug, f"plugin_{slug}_{shard_id}", mem_limit, labels={BATCH_SHARD_LABEL: slug})
+    try:
+        host_port = get_plugin_host_port(c)
+        wait_plugin_ready(host_port, slug)
+    except Exception:
+        remove_plugin_container(c)
+        raise
+    return PluginInstance(c.name, c, host_port)
+
+
+def wait_plugin_ready(host_port: str, slug: str, timeout: float = READY_TIMEOUT_SECONDS) -> None:
+    """Block until the runner answers /healthz (it listens a moment after the container starts)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if requests.get(f"http://127.0.0.1:{host_port}/healthz", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"plugin runner for '{slug}' not ready after {timeout:.0f}s")
+        time.sleep(0.1)
+
+
+def remove_plugin_container(container) -> None:
+    try:
+        container.remove(force=True)
+    except Exception:
+        pass
+
+
+def remove_labelled_containers(label: str) -> int:
+    """Remove every container carrying `label` (runners left behind by a previous process)."""
+    try:
+        found = docker_client.containers.list(all=True, filters={"label": label})
+    except Exception:
+        return 0
+    for c in found:
+        remove_plugin_container(c)
+    return len(found)
+
+
 def get_plugin_host_port(container) -> str:
     container.reload()
     ports = container.attrs.get("NetworkSettings", {}).get("Ports", {})
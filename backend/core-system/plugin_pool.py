@@ -0,0 +1,255 @@
+# SAFE-AI-FRAMEWORK/backend/plugin_pool.py
+"""
+Warm pool of plugin runner containers.
+
+A runner's plugin folder is bind-mounted when the container is created, so
+pools are kept per (slug, mem_limit). Idle containers are started ahead of
+time and only count as ready once /healthz answers, so handing one out never
+waits on a container boot. A runner is retired after PLUGIN_POOL_MAX_USES
+invocations (default 1: every call still gets a fresh container) or once it
+is older than PLUGIN_POOL_TTL_SECONDS; refills happen on background threads.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Optional, Tuple
+
+from plugin_manager import (
+    get_plugin_host_port, plugin_instances, remove_labelled_containers, remove_plugin_container,
+    run_plugin_container, wait_plugin_ready, _plugin_folder, _sanitize_slug,
+)
+
+POOL_SIZE = int(os.environ.get("PLUGIN_POOL_SIZE", "2"))
+POOL_MAX_USES = int(os.environ.get("PLUGIN_POOL_MAX_USES", "1"))
+POOL_TTL_SECONDS = float(os.environ.get("PLUGIN_POOL_TTL_SECONDS", "600"))
+POOL_IDLE_SLUG_SECONDS = 1800     # stop keeping runners for a slug nobody used this long
+POOL_REAP_INTERVAL = 30
+POOL_WORKERS = 4
+POOL_LABEL = "safeai.plugin-pool"
+
+PoolKey = Tuple[str, str]         # (slug, mem_limit)
+
+class Runner:
+    """One started runner container and its published port."""
+
+    def __init__(self, slug: str, mem_limit: str, instance_id: str, container, host_port: str):
+        self.slug = slug
+        self.mem_limit = mem_limit
+        self.instance_id = instance_id
+        self.container = container
+        self.host_port = host_port
+        self.created = time.monotonic()
+        self.uses = 0
+
+    @property
+    def key(self) -> PoolKey:
+        return (self.slug, self.mem_limit)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.host_port}"
+
+    def expired(self, now: float) -> bool:
+        return now - self.created >= POOL_TTL_SECONDS
+
+class _Pool:
+    def __init__(self):
+        self.idle: Deque[Runner] = deque()
+        self.pending = 0
+        self.last_used = time.monotonic()
+
+class WarmPool:
+    def __init__(self, size: int = POOL_SIZE, max_uses: int = POOL_MAX_USES):
+        self.size = size
+        self.max_uses = max_uses
+        self._lock = threading.Lock()
+        self._pools: Dict[PoolKey, _Pool] = {}
+        self._executor = ThreadPoolExecutor(POOL_WORKERS, thread_name_prefix="plugin-pool")
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    # -------------------------------------------------------------------------
+    # Hand out / take back
+    # -------------------------------------------------------------------------
+    def acquire(self, slug: str, mem_limit: str = "512m") -> Runner:
+        """
+        A ready runner for `slug`. Falls back to a cold start when the pool is
+        still empty (first call for a slug, or refills can't keep up).
+        """
+        return self.take(slug, mem_limit) or self._create((_sanitize_slug(slug), mem_limit))
+
+    def take(self, slug: str, mem_limit: str = "512m") -> Optional[Runner]:
+        """An idle runner if one is ready, else None; never blocks on Docker."""
+        slug = _sanitize_slug(slug)
+        _plugin_folder(slug)    # no pool for plugins that don't exist
+        key = (slug, mem_limit)
+        self._ensure_reaper()
+        runner = None
+        stale = []
+        now = time.monotonic()
+        with self._lock:
+            pool = self._pools.setdefault(key, _Pool())
+            pool.last_used = now
+            while pool.idle:
+                r = pool.idle.popleft()
+                if r.expired(now):
+                    stale.append(r)
+                else:
+                    runner = r
+                    break
+        for r in stale:
+            self._retire_later(r)
+        self._refill(key)
+        return runner
+
+    def release(self, runner: Runner, healthy: bool = True) -> None:
+        """Return a runner after one invocation; unhealthy or worn-out ones are removed."""
+        runner.uses += 1
+        keep = False
+        with self._lock:
+            pool = self._pools.get(runner.key)
+            if (pool is not None and healthy and not self._stop.is_set()
+                    and runner.uses < self.max_uses and not runner.expired(time.monotonic())
+                    and len(pool.idle) < self.size):
+                pool.idle.append(runner)
+                keep = True
+        if not keep:
+            self._retire_later(runner)
+            self._refill(runner.key)
+
+    def warm(self, slug: str, mem_limit: str = "512m") -> None:
+        """Start filling the pool for `slug` without taking a runner."""
+        key = (_sanitize_slug(slug), mem_limit)
+        _plugin_folder(key[0])
+        self._ensure_reaper()
+        with self._lock:
+            self._pools.setdefault(key, _Pool()).last_used = time.monotonic()
+        self._refill(key)
+
+    def container_gone(self, container_id: str) -> None:
+        """Docker event hook: forget an idle runner whose container stopped under us."""
+        with self._lock:
+            keys = [key for key, p in self._pools.items() if any(r.container.id == container_id for r in p.idle)]
+            for key in keys:
+                pool = self._pools[key]
+                pool.idle = deque(r for r in pool.idle if r.container.id != container_id)
+        for key in keys:
+            self._refill(key)
+
+    def stats(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                f"{slug}:{mem}": {
+                    "slug": slug,
+                    "mem_limit": mem,
+                    "idle": len(p.idle),
+                    "pending": p.pending,
+                    "idle_for": round(now - p.last_used, 1),
+                }
+                for (slug, mem), p in self._pools.items()
+            }
+
+    # -------------------------------------------------------------------------
+    # Container lifecycle
+    # -------------------------------------------------------------------------
+    def _create(self, key: PoolKey) -> Runner:
+        slug, mem_limit = key
+        instance_id = f"w{uuid.uuid4().hex[:8]}"
+        container = run_plugin_container(
+            slug, f"plugin_{slug}_{instance_id}", mem_limit, labels={POOL_LABEL: slug},
+        )
+        try:
+            runner = Runner(slug, mem_limit, instance_id, container, get_plugin_host_port(container))
+            wait_plugin_ready(runner.host_port, slug)
+        except Exception:
+            remove_plugin_container(container)
+            raise
+        return runner
+
+    def _refill(self, key: PoolKey) -> None:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None or self._stop.is_set():
+                return
+            missing = self.size - len(pool.idle) - pool.pending
+            if missing <= 0:
+                return
+            pool.pending += missing
+        for _ in range(missing):
+            self._executor.submit(self._fill_one, key)
+
+    def _fill_one(self, key: PoolKey) -> None:
+        runner = None
+        try:
+            runner = self._create(key)
+        except Exception as e:
+            print(f"[plugin-pool] warming {key[0]} failed: {e}")
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None:
+                pool.pending -= 1
+                if runner is not None and not self._stop.is_set():
+                    pool.idle.append(runner)
+                    return
+        if runner is not None:
+            remove_plugin_container(runner.container)
+
+    def _retire_later(self, runner: Runner) -> None:
+        try:
+            self._executor.submit(remove_plugin_container, runner.container)
+        except RuntimeError:  # executor already shut down
+            remove_plugin_container(runner.container)
+
+    # -------------------------------------------------------------------------
+    # Housekeeping
+    # -------------------------------------------------------------------------
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None:
+            with self._lock:
+                if self._reaper is None:
+                    self._reaper = threading.Thread(target=self._reap_loop, name="plugin-pool-reaper", daemon=True)
+                    self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while not self._stop.wait(POOL_REAP_INTERVAL):
+            self.reap()
+
+    def reap(self) -> None:
+        """Drop expired runners and pools of slugs that went quiet; top the rest up."""
+        now = time.monotonic()
+        stale, active = [], []
+        with self._lock:
+            for key, pool in list(self._pools.items()):
+                if now - pool.last_used >= POOL_IDLE_SLUG_SECONDS:
+                    stale.extend(pool.idle)
+                    pool.idle.clear()
+                    if not pool.pending:
+                        del self._pools[key]
+                    continue
+                stale.extend(r for r in pool.idle if r.expired(now))
+                pool.idle = deque(r for r in pool.idle if not r.expired(now))
+                active.append(key)
+        for r in stale:
+            self._retire_later(r)
+        for key in active:
+            self._refill(key)
+
+    def remove_orphans(self) -> int:
+        """Remove pool containers left behind by a previous process."""
+        return remove_labelled_containers(POOL_LABEL)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        with self._lock:
+            runners = [r for p in self._pools.values() for r in p.idle]
+            self._pools.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for r in runners:
+            remove_plugin_container(r.container)
+
+warm_pool = WarmPool()
+plugin_instances.subscribe(warm_pool.container_gone)
@@ -1,8 +1,32 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import requests
+import asyncio
+import os
+import time
+import uuid
+from contextlib import suppress
+from typing import Awaitable
 
-from plugin_manager import start_plugin_container, stop_plugin_container, get_plugin_host_port
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from plugin_instances import PluginInstance
+from plugin_manager import (
+    cached_plugin_instance, ensure_plugin_instance, plugin_instances, plugin_manifest, reload_plugin,
+    remove_plugin_container, start_batch_shard, stop_plugin_container,
+)
+from plugin_pool import Runner, warm_pool
+
+PLUGIN_TIMEOUT_MS = int(os.environ.get("PLUGIN_TIMEOUT_MS", "8000"))   # same default as the runner
+PLUGIN_MAX_TIMEOUT_MS = 300_000
+RUNNER_GRACE_SECONDS = 2.0
+RUNNER_PLUGIN_ERROR = 422      # runner /run: the plugin threw; the runner itself is fine
+RUNNER_PLUGIN_TIMEOUT = 504    # runner /run: its own timeout fired; the plugin may still be busy
+HTTP_MAX_CONNECTIONS = 256
+HTTP_MAX_KEEPALIVE = 64
+BATCH_MAX_ITEMS = 10_000
+BATCH_MAX_CONCURRENCY = 64
+BATCH_MAX_INSTANCES = 8
 
 router = APIRouter()
 
@@ -13,20 +37,30 @@ class StartPayload(BaseModel):
     mem_limit: str | None = "512m"
 
 @router.post("/start")
-def start_plugin(body: StartPayload):
+async def start_plugin(body: StartPayload):
     try:
-        c = start_plugin_container(
+        if not body.reuse and not body.instance_id:
+            # take a pre-started runner out of the pool; the caller owns it now
+            runner = await run_in_threadpool(warm_pool.acquire, body.slug, body.mem_limit or "512m")
+            return {
+                "ok": True,
+                "slug": body.slug,
+                "instance_id": runner.instance_id,
+                "host_port": runner.host_port,
+                "base_url": runner.base_url,
+            }
+        inst = await run_in_threadpool(
+            ensure_plugin_instance,
             slug=body.slug,
             reuse=body.reuse,
             instance_id=body.instance_id,
             mem_limit=body.mem_limit or "512m",
         )
-        host_port = get_plugin_host_port(c)
         return {
             "ok": True,
             "slug": body.slug,
-            "host_port": host_port,
-            "base_url": f"http://127.0.0.1:{host_port}"
+            "host_port": inst.host_port,
+            "base_url": inst.base_url
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -39,25 +73,97 @@ class RunPayload(BaseModel):
     reuse: bool = True
     instance_id: str | None = None
     mem_limit: str | None = "512m"
+    timeout_ms: int | None = None   # overrides the plugin manifest's timeout_ms
 
 @router.post("/run")
-def run_plugin(body: RunPayload):
+async def run_plugin(body: RunPayload, request: Request):
     try:
-        c = start_plugin_container(
-            slug=body.slug,
-            reuse=body.reuse,
-            instance_id=body.instance_id,
-            mem_limit=body.mem_limit or "512m",
-        )
-        host_port = get_plugin_host_port(c)
-        url = f"http://127.0.0.1:{host_port}/run"
+        result = await _unless_disconnected(request, _run_one(
+            body.slug, body.input, body.metadata, body.reuse, body.instance_id,
+            body.mem_limit or "512m", body.timeout_ms,
+        ))
+        return {"ok": True, "slug": body.slug, "result": result}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e) or type(e).__name__)
 
-        r = requests.post(
-            url,
-            json={"input": body.input or {}, "metadata": body.metadata or {}},
-            timeout=30
-        )
 
+# ==============================================================================
+# Invocation
+# ==============================================================================
+class _Target:
+    """Where one invocation goes: a pooled runner (handed back after) or a named instance."""
+
+    def __init__(self, base_url: str, runner: Runner | None = None, inst: PluginInstance | None = None):
+        self.base_url = base_url
+        self.runner = runner
+        self.inst = inst
+        self.failed = False     # a call got no usable answer; pooled runners are then retired
+
+    def release(self) -> None:
+        if self.runner is not None:
+            warm_pool.release(self.runner, healthy=not self.failed)
+
+async def _resolve_target(slug: str, reuse: bool, instance_id: str | None, mem_limit: str) -> _Target:
+    # cache hits never leave the event loop; starting containers goes to the threadpool
+    if not reuse and not instance_id:
+        runner = warm_pool.take(slug, mem_limit) or await run_in_threadpool(warm_pool.acquire, slug, mem_limit)
+        return _Target(runner.base_url, runner=runner)
+    inst = cached_plugin_instance(slug, reuse, instance_id) or await run_in_threadpool(
+        ensure_plugin_instance, slug, reuse, instance_id, mem_limit,
+    )
+    return _Target(inst.base_url, inst=inst)
+
+def _timeout_ms(slug: str, requested: int | None) -> int:
+    value = requested or plugin_manifest(slug).get("timeout_ms") or PLUGIN_TIMEOUT_MS
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = PLUGIN_TIMEOUT_MS
+    return max(1, min(value, PLUGIN_MAX_TIMEOUT_MS))
+
+async def _run_one(
+    slug: str,
+    input: dict | None,
+    metadata: dict | None,
+    reuse: bool = True,
+    instance_id: str | None = None,
+    mem_limit: str = "512m",
+    timeout_ms: int | None = None,
+):
+    """Invoke the plugin once and return its result; errors raise HTTPException."""
+    timeout_ms = _timeout_ms(slug, timeout_ms)
+    target = await _resolve_target(slug, reuse, instance_id, mem_limit)
+    try:
+        return await _invoke(target, slug, input, metadata, timeout_ms)
+    finally:
+        target.release()
+
+async def _invoke(target: _Target, slug: str, input: dict | None, metadata: dict | None, timeout_ms: int):
+    answered = False
+    try:
+        try:
+            r = await _http_client().post(
+                f"{target.base_url}/run",
+                json={"input": input or {}, "metadata": metadata or {}, "timeout_ms": timeout_ms},
+                # the runner enforces timeout_ms itself; give it time to say so
+                timeout=httpx.Timeout(timeout_ms / 1000 + RUNNER_GRACE_SECONDS, connect=5.0),
+            )
+        except httpx.ConnectError:
+            # the cached port is gone before Docker told us; look it up again next time
+            if target.inst is not None:
+                plugin_instances.invalidate(target.inst.name)
+            raise
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail=f"Plugin '{slug}' timed out after {timeout_ms} ms")
+        # the runner answered; a plugin-level error doesn't make it unusable
+        answered = r.status_code in (200, RUNNER_PLUGIN_ERROR)
+
+        if r.status_code == RUNNER_PLUGIN_TIMEOUT:
+            raise HTTPException(status_code=504, detail=f"Plugin '{slug}' timed out after {timeout_ms} ms")
+        if r.status_code == RUNNER_PLUGIN_ERROR:
+            raise HTTPException(status_code=500, detail=_runner_error(r))
         # ✅ if runner fails, return its text/json in detail
         if r.status_code >= 400:
             raise HTTPException(
@@ -68,13 +174,173 @@ def run_plugin(body: RunPayload):
         data = r.json()
         if not data.get("ok"):
             raise HTTPException(status_code=500, detail=data.get("error", "plugin error"))
+        return data.get("result")
+    finally:
+        if not answered:
+            target.failed = True
 
-        return {"ok": True, "slug": body.slug, "result": data.get("result")}
+def _runner_error(r: httpx.Response) -> str:
+    try:
+        return r.json().get("error") or "plugin error"
+    except ValueError:
+        return r.text or "plugin error"
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def _client_disconnected(request: Request) -> None:
+    # the body has been read already, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+async def _unless_disconnected(request: Request, work: Awaitable):
+    """
+    Await `work`, cancelling it if the caller goes away. Cancelling drops the
+    connection to the runner, which aborts the plugin through ctx.signal.
+    """
+    task = asyncio.ensure_future(work)
+    gone = asyncio.ensure_future(_client_disconnected(request))
+    try:
+        await asyncio.wait({task, gone}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        gone.cancel()
+        task.cancel()
+
+# One pooled client for every runner: keep-alive connections are kept per host
+# port, so repeated calls to the same container skip the TCP handshake.
+_http: httpx.AsyncClient | None = None
+_http_loop: asyncio.AbstractEventLoop | None = None
+
+def _http_client() -> httpx.AsyncClient:
+    global _http, _http_loop
+    loop = asyncio.get_running_loop()
+    if _http is None or _http_loop is not loop:
+        _http = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ))
+        _http_loop = loop
+    return _http
+
+async def close_http_client() -> None:
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+class BatchItem(BaseModel):
+    slug: str | None = None         # defaults to the batch slug
+    input: dict | None = None
+    metadata: dict | None = None
+    timeout_ms: int | None = None
+
+class RunBatchPayload(BaseModel):
+    slug: str | None = None
+    items: list[BatchItem] = Field(..., max_length=BATCH_MAX_ITEMS)
+    metadata: dict | None = None    # merged under each item's metadata
+    reuse: bool = True
+    mem_limit: str | None = "512m"
+    concurrency: int = Field(8, ge=1, le=BATCH_MAX_CONCURRENCY)
+    instances: int = Field(1, ge=1, le=BATCH_MAX_INSTANCES)   # runners per slug (reuse=True only)
+
+@router.post("/run-batch")
+async def run_plugin_batch(body: RunBatchPayload, request: Request):
+    """
+    Run many inputs in one request, at most `concurrency` in flight. With
+    reuse=True items are spread round-robin over `instances` runners per slug;
+    with reuse=False each item gets a pooled runner like a single /run.
+    Results come back in input order with per-item errors and timings.
+    """
+    slugs = [item.slug or body.slug for item in body.items]
+    if not all(slugs):
+        raise HTTPException(status_code=400, detail="Every item needs a slug (or set one for the batch)")
+    started = time.perf_counter()
+    results = await _unless_disconnected(request, _run_batch(body, slugs))
+    succeeded = sum(1 for r in results if r["ok"])
+    return {
+        "ok": succeeded == len(results),
+        "count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+        "results": results,
+    }
+
+async def _batch_targets(slug: str, body: RunBatchPayload, batch_id: str) -> list[_Target]:
+    """The slug's long-lived runner plus `instances - 1` labelled shards for this batch only."""
+    mem_limit = body.mem_limit or "512m"
+    targets = [await _resolve_target(slug, True, None, mem_limit)]
+    started = await asyncio.gather(*(
+        run_in_threadpool(start_batch_shard, slug, f"{batch_id}s{i}", mem_limit)
+        for i in range(1, body.instances)
+    ), return_exceptions=True)
+    for inst in started:
+        if isinstance(inst, BaseException):
+            print(f"[plugins] batch shard for {slug} failed to start: {inst}")
+        else:
+            targets.append(_Target(inst.base_url, inst=inst))
+    return targets
+
+async def _run_batch(body: RunBatchPayload, slugs: list[str]) -> list[dict]:
+    # reuse=False: every item takes its own pooled runner, so PLUGIN_POOL_MAX_USES
+    # still counts invocations; reuse=True: items share the slug's runners
+    targets: dict[str, list[_Target] | Exception] = {}
+    batch_id = f"b{uuid.uuid4().hex[:8]}"
+    mem_limit = body.mem_limit or "512m"
+    sem = asyncio.Semaphore(body.concurrency)
+    seen: dict[str, int] = {}
+
+    async def run_item(index: int, slug: str, item: BatchItem) -> dict:
+        out = {"index": index, "slug": slug}
+        shard = seen[slug] = seen.get(slug, -1) + 1
+        async with sem:
+            started = time.perf_counter()
+            try:
+                metadata = {**(body.metadata or {}), **(item.metadata or {})}
+                if not body.reuse:
+                    out["result"] = await _run_one(
+                        slug, item.input, metadata, False, None, mem_limit, item.timeout_ms,
+                    )
+                else:
+                    pool = targets[slug]
+                    if isinstance(pool, Exception):
+                        raise pool
+                    out["result"] = await _invoke(
+                        pool[shard % len(pool)], slug, item.input, metadata, _timeout_ms(slug, item.timeout_ms),
+                    )
+                out["ok"] = True
+            except HTTPException as e:
+                out.update(ok=False, status=e.status_code, error=e.detail)
+            except Exception as e:
+                out.update(ok=False, status=500, error=str(e) or type(e).__name__)
+            out["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return out
+
+    try:
+        if body.reuse:
+            for slug in dict.fromkeys(slugs):
+                try:
+                    targets[slug] = await _batch_targets(slug, body, batch_id)
+                except Exception as e:
+                    targets[slug] = e
+        return list(await asyncio.gather(*(
+            run_item(i, slug, item) for i, (slug, item) in enumerate(zip(slugs, body.items))
+        )))
+    finally:
+        shards = [
+            t.inst for pool in targets.values() if not isinstance(pool, Exception)
+            for t in pool[1:]
+        ]
+        for inst in shards:
+            plugin_instances.invalidate(inst.name)
+        if shards:
+            asyncio.get_running_loop().run_in_executor(
+                None, lambda: [remove_plugin_container(i.container) for i in shards],
+            )
 
 
 class StopPayload(BaseModel):
@@ -87,3 +353,41 @@ def stop_plugin(body: StopPayload):
         return {"ok": True, "stopped": stop_plugin_container(body.slug, body.instance_id)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+class ReloadPayload(BaseModel):
+    slug: str
+    force: bool = False
+
+@router.post("/reload")
+async def reload_plugin_runners(body: ReloadPayload):
+    try:
+        runners = await run_in_threadpool(reload_plugin, body.slug, body.force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"ok": all(r["ok"] for r in runners), "slug": body.slug, "runners": runners}
+
+
+class WarmPayload(BaseModel):
+    slug: str
+    mem_limit: str | None = "512m"
+
+@router.post("/pool/warm")
+def warm_plugin_pool(body: WarmPayload):
+    try:
+        warm_pool.warm(body.slug, body.mem_limit or "512m")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, "pools": warm_pool.stats()}
+
+@router.get("/instances")
+def plugin_instance_list():
+    return {"instances": plugin_instances.instances()}
+
+@router.get("/pool")
+def plugin_pool_stats():
+    return {"size": warm_pool.size, "max_uses": warm_pool.max_uses, "pools": warm_pool.stats()}
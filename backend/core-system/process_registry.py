@@ -3,6 +3,9 @@ from pathlib import Path
 from typing import Optional, List, Dict
 import json, psutil, shutil
 
+from project_index import ProjectIndex
+from registry_db import RegistryDB
+
 # -----------------------------------------------------------------------------
 # Storage layout (outside backend to prevent uvicorn reload loops)
 # -----------------------------------------------------------------------------
@@ -10,31 +13,63 @@ REPO_ROOT   = Path(__file__).parent.parent.resolve()
 STORAGE_DIR = (REPO_ROOT / "storage")
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
-PID_FILE    = STORAGE_DIR / "core.pid"          # legacy single-pid
-PIDS_FILE   = STORAGE_DIR / "core.pids.json"    # multi-pid (frontend/backend)
 META_FILE   = STORAGE_DIR / "core.meta.json"
 JAR_FILE    = STORAGE_DIR / "core.jar"          # legacy single-jar path
 PROJECT_DIR = STORAGE_DIR / "core_project"      # full uploaded project
 
-# New: container tracking (for Docker-run core apps)
+# Processes and containers we started (SQLite, WAL; see registry_db.py)
+REGISTRY_DB = STORAGE_DIR / "core.registry.db"
+CORE_PID_KEY = "__core__"                       # the legacy single pid
+
+# Files used before the registry DB; imported once, then renamed *.migrated
+PID_FILE        = STORAGE_DIR / "core.pid"
+PIDS_FILE       = STORAGE_DIR / "core.pids.json"
+HOST_PIDS_FILE  = STORAGE_DIR / "pids.json"
 CONTAINERS_FILE = STORAGE_DIR / "containers.json"
 
+registry = RegistryDB(REGISTRY_DB)
+
+def _migrate_json_registries() -> None:
+    def load(path: Path):
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        finally:
+            path.replace(path.with_name(path.name + ".migrated"))
+
+    if PID_FILE.exists():
+        pid = load(PID_FILE)
+        if isinstance(pid, int):
+            registry.put_process(CORE_PID_KEY, pid)
+    for path in (PIDS_FILE, HOST_PIDS_FILE):
+        if path.exists():
+            for name, rec in (load(path) or {}).items():
+                pid = rec.get("pid") if isinstance(rec, dict) else rec
+                if isinstance(pid, int):
+                    registry.put_process(name, pid, (rec.get("cwd") if isinstance(rec, dict) else None))
+    if CONTAINERS_FILE.exists():
+        for name, rec in (load(CONTAINERS_FILE) or {}).items():
+            if isinstance(rec, dict) and rec.get("id"):
+                registry.put_container(name, rec["id"], rec.get("info"))
+
+_migrate_json_registries()
+
+# In-memory index of PROJECT_DIR (built lazily, refreshed by the endpoints that write)
+project_index = ProjectIndex(PROJECT_DIR)
+
 # -----------------------------------------------------------------------------
 # Single PID helpers (legacy)
 # -----------------------------------------------------------------------------
 def write_pid(pid: int) -> None:
-    PID_FILE.write_text(str(pid), encoding="utf-8")
+    registry.put_process(CORE_PID_KEY, pid)
 
 def read_pid() -> Optional[int]:
-    if PID_FILE.exists():
-        try:
-            return int(PID_FILE.read_text().strip())
-        except Exception:
-            return None
-    return None
+    rec = registry.get_process(CORE_PID_KEY)
+    return rec["pid"] if rec else None
 
 def clear_pid() -> None:
-    PID_FILE.unlink(missing_ok=True)
+    registry.delete_process(CORE_PID_KEY)
 
 def is_running() -> bool:
     pid = read_pid()
@@ -50,28 +85,19 @@ def is_running() -> bool:
 # Multi-PID helpers (for starting multiple node apps)
 # -----------------------------------------------------------------------------
 def read_pids() -> Dict[str, Dict]:
-    if PIDS_FILE.exists():
-        try:
-            return json.loads(PIDS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+    data = registry.processes()
+    data.pop(CORE_PID_KEY, None)
+    return data
 
 def write_pids(data: Dict) -> None:
-    PIDS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    PIDS_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    registry.replace_processes(data, keep=CORE_PID_KEY)
 
 def add_pid(name: str, pid: int, cwd: Optional[Path] = None) -> None:
     """
     Store a pid under a human-readable key (e.g. 'frontend', 'backend').
     'cwd' is optional so calls like add_pid(name, pid) still work.
     """
-    data = read_pids()
-    rec: Dict[str, str | int] = {"pid": pid}
-    if cwd is not None:
-        rec["cwd"] = str(cwd)
-    data[name] = rec
-    write_pids(data)
+    registry.put_process(name, pid, str(cwd) if cwd is not None else None)
 
 def clear_pids() -> None:
     write_pids({})
@@ -83,31 +109,23 @@ def read_containers() -> Dict[str, Dict]:
     """
     Returns a mapping: subdir -> { "id": <container_id>, "info": {...} }
     """
-    if CONTAINERS_FILE.exists():
-        try:
-            return json.loads(CONTAINERS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return {}
-    return {}
+    return registry.containers()
+
+def get_container(name: str) -> Optional[Dict]:
+    return registry.get_container(name)
 
 def write_containers(data: Dict[str, Dict]) -> None:
-    CONTAINERS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    CONTAINERS_FILE.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    registry.replace_containers(data)
 
 def add_container(name: str, container_id: str, info: Optional[Dict] = None) -> None:
     """
     Track a started container under a human-readable key (usually the project subdir).
     Example info: {"name": "safeai_frontend", "port": 5173}
     """
-    data = read_containers()
-    data[name] = {"id": container_id, "info": info or {}}
-    write_containers(data)
+    registry.put_container(name, container_id, info)
 
 def remove_container(name: str) -> None:
-    data = read_containers()
-    if name in data:
-        del data[name]
-        write_containers(data)
+    registry.delete_container(name)
 
 def clear_containers() -> None:
     write_containers({})
@@ -123,18 +141,13 @@ def project_present() -> bool:
     Treat project as present if the project directory exists and has at least
     one entry (file OR folder).
     """
-    if not PROJECT_DIR.exists():
-        return False
-    try:
-        next(PROJECT_DIR.iterdir())
-        return True
-    except StopIteration:
-        return False
+    return not project_index.is_empty()
 
 def reset_project_dir() -> None:
     if PROJECT_DIR.exists():
         shutil.rmtree(PROJECT_DIR)
     PROJECT_DIR.mkdir(parents=True, exist_ok=True)
+    project_index.root_replaced()
 
 # -----------------------------------------------------------------------------
 # Java detection (legacy)
@@ -148,15 +161,17 @@ def find_runnable_jar() -> Optional[Path]:
     if JAR_FILE.exists():
         return JAR_FILE
     if project_present():
-        candidates = [p for p in PROJECT_DIR.rglob("*.jar") if p.is_file()]
-        def score(p: Path) -> int:
+        candidates = project_index.find_suffix(".jar")
+        def score(rel: str) -> int:
+            p = Path(rel)
+            entry = project_index.get(rel)
             s = 0
             if "target" in p.parts or "build" in p.parts: s += 2
             if "-sources" in p.name or "-javadoc" in p.name: s -= 5
-            if p.stat().st_size > 1024 * 100: s += 1  # >100KB
+            if entry and entry.size > 1024 * 100: s += 1  # >100KB
             return s
         if candidates:
-            return sorted(candidates, key=score, reverse=True)[0]
+            return PROJECT_DIR / sorted(candidates, key=score, reverse=True)[0]
     return None
 
 def java_present() -> bool:
@@ -171,15 +186,10 @@ def node_candidates(max_depth: int = 3) -> List[Path]:
     Return candidate folders (relative to PROJECT_DIR) that contain package.json.
     Skips node_modules. Limits depth for performance.
     """
-    if not PROJECT_DIR.exists():
-        return []
     cands: List[Path] = []
-    for pkg in PROJECT_DIR.rglob("package.json"):
-        if "node_modules" in pkg.parts:
-            continue
-        try:
-            rel = pkg.parent.relative_to(PROJECT_DIR)
-        except ValueError:
+    for pkg in project_index.find_name("package.json"):
+        rel = Path(pkg).parent
+        if "node_modules" in rel.parts:
             continue
         if len(rel.parts) <= max_depth:
             cands.append(rel)
@@ -0,0 +1,280 @@
+# SAFE-AI-FRAMEWORK/backend/project_index.py
+import os
+import threading
+from bisect import bisect_right
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+class Entry(NamedTuple):
+    is_dir: bool
+    size: int
+    mtime: float
+
+# explorer order: folders first, then case-insensitive name
+SortKey = Tuple[bool, str, str]
+
+def sort_key(name: str, is_dir: bool) -> SortKey:
+    return (not is_dir, name.lower(), name)
+
+def _join(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+class ProjectIndex:
+    """
+    In-memory index of every path under the uploaded project (type, size,
+    mtime), plus lookup tables by file name and by suffix. It is built once
+    (lazily, or explicitly after an upload) and then kept current by the
+    endpoints that change the tree, so callers get O(1)/O(matches) answers
+    instead of walking the whole project with rglob.
+
+    Paths are POSIX strings relative to the root; "" is the root itself.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._lock = threading.RLock()
+        self._built = False
+        self._entries: Dict[str, Entry] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._by_suffix: Dict[str, Set[str]] = {}
+        self._dir_sizes: Dict[str, int] = {}             # folder -> total bytes below it
+        self._sorted: Dict[str, List[SortKey]] = {}      # folder -> children in explorer order (lazy)
+        self._watch_restart = threading.Event()
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+    def relative(self, path: Path) -> Optional[str]:
+        try:
+            rel = Path(os.path.abspath(path)).relative_to(os.path.abspath(self.root))
+        except ValueError:
+            return None
+        return rel.as_posix() if rel.parts else ""
+
+    def _bump_sizes(self, rel: str, delta: int) -> None:
+        while rel:
+            rel = rel.rpartition("/")[0]
+            self._dir_sizes[rel] = self._dir_sizes.get(rel, 0) + delta
+
+    def _add(self, rel: str, entry: Entry) -> None:
+        old = self._entries.get(rel)
+        self._entries[rel] = entry
+        if entry.is_dir:
+            self._dir_sizes.setdefault(rel, 0)
+        delta = (0 if entry.is_dir else entry.size) - (0 if old is None or old.is_dir else old.size)
+        if delta:
+            self._bump_sizes(rel, delta)
+        if rel == "":
+            return
+        parent, _, name = rel.rpartition("/")
+        self._children.setdefault(parent, set()).add(name)
+        self._sorted.pop(parent, None)
+        if not entry.is_dir:
+            self._by_name.setdefault(name, set()).add(rel)
+            suffix = PurePosixPath(name).suffix.lower()
+            if suffix:
+                self._by_suffix.setdefault(suffix, set()).add(rel)
+
+    def _drop(self, rel: str) -> None:
+        entry = self._entries.pop(rel, None)
+        if entry is None:
+            return
+        if entry.is_dir:
+            for name in list(self._children.get(rel, ())):
+                self._drop(_join(rel, name))
+            self._children.pop(rel, None)
+            self._dir_sizes.pop(rel, None)
+            self._sorted.pop(rel, None)
+        elif entry.size:
+            self._bump_sizes(rel, -entry.size)
+        if rel == "":
+            return
+        parent, _, name = rel.rpartition("/")
+        siblings = self._children.get(parent)
+        if siblings is not None:
+            siblings.discard(name)
+        self._sorted.pop(parent, None)
+        if not entry.is_dir:
+            self._by_name.get(name, set()).discard(rel)
+            suffix = PurePosixPath(name).suffix.lower()
+            if suffix:
+                self._by_suffix.get(suffix, set()).discard(rel)
+
+    def _scan(self, path: Path, rel: str) -> None:
+        """Add `path` and (for folders) everything below it."""
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        is_dir = path.is_dir()
+        self._add(rel, Entry(is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+        if not is_dir:
+            return
+        stack = [(str(path), rel)]
+        while stack:
+            dir_path, dir_rel = stack.pop()
+            try:
+                it = os.scandir(dir_path)
+            except OSError:
+                continue
+            with it:
+                for de in it:
+                    child_rel = _join(dir_rel, de.name)
+                    try:
+                        child_is_dir = de.is_dir(follow_symlinks=False)
+                        st = de.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    self._add(child_rel, Entry(child_is_dir, 0 if child_is_dir else st.st_size, st.st_mtime))
+                    if child_is_dir:
+                        stack.append((de.path, child_rel))
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._children.clear()
+            self._by_name.clear()
+            self._by_suffix.clear()
+            self._dir_sizes.clear()
+            self._sorted.clear()
+            if self.root.exists():
+                self._scan(self.root, "")
+            self._built = True
+
+    def root_replaced(self) -> None:
+        """The project folder itself was swapped/recreated: re-index and re-arm the watcher."""
+        self.rebuild()
+        self.wake_watcher()
+
+    def wake_watcher(self) -> None:
+        """Make a running watch_project() drop its current watch (it re-arms unless cancelled)."""
+        self._watch_restart.set()
+
+    def ensure_built(self) -> None:
+        if not self._built:
+            self.rebuild()
+
+    def update_path(self, path: Path) -> None:
+        """Re-index `path` (file or whole folder) after it was created or changed."""
+        with self._lock:
+            if not self._built:
+                return self.rebuild()
+            rel = self.relative(path)
+            if rel is None:
+                return
+            if not path.exists():
+                return self._drop(rel)
+            self._drop(rel)
+            # make sure the parents are known (e.g. save into a brand-new folder)
+            missing = []
+            parent = path.parent
+            while True:
+                parent_rel = self.relative(parent)
+                if parent_rel is None or parent_rel in self._entries:
+                    break
+                missing.append((parent, parent_rel))
+                parent = parent.parent
+            for p, p_rel in reversed(missing):
+                self._add(p_rel, Entry(True, 0, p.stat().st_mtime))
+            self._scan(path, rel)
+
+    def remove_path(self, path: Path) -> None:
+        with self._lock:
+            if not self._built:
+                return self.rebuild()
+            rel = self.relative(path)
+            if rel is not None:
+                self._drop(rel)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    def is_empty(self) -> bool:
+        with self._lock:
+            self.ensure_built()
+            return not self._children.get("")
+
+    def get(self, rel: str) -> Optional[Entry]:
+        with self._lock:
+            self.ensure_built()
+            return self._entries.get(rel)
+
+    def child_count(self, rel: str, skip: Optional[Callable[[str], bool]] = None) -> int:
+        """Children of folder `rel`, not counting names for which `skip` returns True (as in page())."""
+        with self._lock:
+            self.ensure_built()
+            names = self._children.get(rel, ())
+            if skip is None:
+                return len(names)
+            return sum(1 for name in names if not skip(name))
+
+    def dir_size(self, rel: str) -> int:
+        with self._lock:
+            self.ensure_built()
+            return self._dir_sizes.get(rel, 0)
+
+    def page(
+        self,
+        rel: str,
+        after: Optional[SortKey] = None,
+        limit: int = 500,
+        skip: Optional[Callable[[str], bool]] = None,
+    ) -> Tuple[List[Tuple[str, Entry]], bool]:
+        """
+        Up to `limit` children of folder `rel` in explorer order, starting after
+        the sort key `after` (a cursor that stays valid while entries come and go).
+        Names for which `skip` returns True are left out. Returns (items, more).
+        """
+        with self._lock:
+            self.ensure_built()
+            keys = self._sorted.get(rel)
+            if keys is None:
+                keys = self._sorted[rel] = sorted(
+                    sort_key(name, self._entries[_join(rel, name)].is_dir)
+                    for name in self._children.get(rel, ())
+                )
+            out: List[Tuple[str, Entry]] = []
+            start = bisect_right(keys, after) if after else 0
+            for i in range(start, len(keys)):
+                name = keys[i][2]
+                if skip is not None and skip(name):
+                    continue
+                if len(out) == limit:
+                    return out, True
+                out.append((name, self._entries[_join(rel, name)]))
+            return out, False
+
+    def find_name(self, name: str) -> List[str]:
+        with self._lock:
+            self.ensure_built()
+            return sorted(self._by_name.get(name, ()))
+
+    def find_suffix(self, suffix: str) -> List[str]:
+        with self._lock:
+            self.ensure_built()
+            return sorted(self._by_suffix.get(suffix.lower(), ()))
+
+# -----------------------------------------------------------------------------
+# Optional filesystem watcher (set CORE_INDEX_WATCH=1)
+# -----------------------------------------------------------------------------
+async def watch_project(index: ProjectIndex) -> None:
+    """
+    Keep `index` current for changes made outside the API (editors, npm
+    install on the host, bind-mounted containers) using inotify/FSEvents via
+    watchfiles. Runs until cancelled.
+    """
+    from watchfiles import awatch, Change
+
+    while True:
+        index._watch_restart.clear()
+        index.root.mkdir(parents=True, exist_ok=True)
+        # awatch returns once root_replaced() sets the event; then watch the new folder
+        async for changes in awatch(index.root, stop_event=index._watch_restart):
+            for change, raw in changes:
+                path = Path(raw)
+                # events can be stale by the time we see them; trust the disk
+                if change == Change.deleted and not path.exists():
+                    index.remove_path(path)
+                elif path.exists():
+                    index.update_path(path)
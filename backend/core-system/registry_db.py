@@ -0,0 +1,127 @@
+# SAFE-AI-FRAMEWORK/backend/registry_db.py
+"""
+SQLite-backed registry of host processes and Docker containers.
+
+Replaces the read-modify-write JSON files: every change is one transaction
+(WAL mode, so readers never block the writer and a crash never leaves a half
+written file), and lookups by name use the primary key.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS processes (
+    name    TEXT PRIMARY KEY,
+    pid     INTEGER NOT NULL,
+    cwd     TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS containers (
+    name         TEXT PRIMARY KEY,
+    container_id TEXT NOT NULL,
+    info         TEXT NOT NULL DEFAULT '{}',
+    updated      REAL NOT NULL
+);
+"""
+
+class RegistryDB:
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: we issue BEGIN/COMMIT ourselves
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # -------------------------------------------------------------------------
+    # Processes
+    # -------------------------------------------------------------------------
+    def get_process(self, name: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT pid, cwd FROM processes WHERE name = ?", (name,)).fetchone()
+        return {"pid": row["pid"], **({"cwd": row["cwd"]} if row["cwd"] else {})} if row else None
+
+    def processes(self) -> Dict[str, Dict]:
+        rows = self._conn().execute("SELECT name, pid, cwd FROM processes ORDER BY name").fetchall()
+        return {r["name"]: {"pid": r["pid"], **({"cwd": r["cwd"]} if r["cwd"] else {})} for r in rows}
+
+    def put_process(self, name: str, pid: int, cwd: Optional[str] = None) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO processes (name, pid, cwd, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET pid = excluded.pid, cwd = excluded.cwd, updated = excluded.updated",
+                (name, pid, cwd, time.time()),
+            )
+
+    def delete_process(self, name: str) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM processes WHERE name = ?", (name,))
+
+    def replace_processes(self, data: Dict[str, Dict], keep: Optional[str] = None) -> None:
+        """Swap the whole process table (except `keep`) for `data` in one transaction."""
+        with self._tx() as conn:
+            conn.execute("DELETE FROM processes WHERE name IS NOT ?", (keep,))
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO processes (name, pid, cwd, updated) VALUES (?, ?, ?, ?)",
+                [(name, int(rec["pid"]), rec.get("cwd"), now) for name, rec in data.items()],
+            )
+
+    # -------------------------------------------------------------------------
+    # Containers
+    # -------------------------------------------------------------------------
+    def get_container(self, name: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT container_id, info FROM containers WHERE name = ?", (name,)
+        ).fetchone()
+        return {"id": row["container_id"], "info": json.loads(row["info"])} if row else None
+
+    def containers(self) -> Dict[str, Dict]:
+        rows = self._conn().execute("SELECT name, container_id, info FROM containers ORDER BY name").fetchall()
+        return {r["name"]: {"id": r["container_id"], "info": json.loads(r["info"])} for r in rows}
+
+    def put_container(self, name: str, container_id: str, info: Optional[Dict] = None) -> None:
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO containers (name, container_id, info, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET container_id = excluded.container_id, "
+                "info = excluded.info, updated = excluded.updated",
+                (name, container_id, json.dumps(info or {}), time.time()),
+            )
+
+    def delete_container(self, name: str) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM containers WHERE name = ?", (name,))
+
+    def replace_containers(self, data: Dict[str, Dict]) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM containers")
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO containers (name, container_id, info, updated) VALUES (?, ?, ?, ?)",
+                [(name, rec["id"], json.dumps(rec.get("info") or {}), now) for name, rec in data.items()],
+            )
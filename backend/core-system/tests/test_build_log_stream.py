@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from build_log import BuildLog, split_lines  # noqa: E402
+
+
+def test_line_split_across_two_reads(tmp_path):
+    log = BuildLog(tmp_path / "build.log")
+    log.write("npm WARN partial")
+    pos, pending, events = 0, b"", []
+
+    def drain():
+        nonlocal pos, pending
+        while pos < log.end:
+            data, pos = log.read(pos, 8)
+            lines, pending = split_lines(pending + data)
+            if lines:
+                events.append((lines, pos - len(pending)))
+
+    drain()
+    assert events == [] and pending == b"npm WARN partial"
+
+    log.write(" line\nnext")
+    drain()
+    assert events == [([b"npm WARN partial line"], len(b"npm WARN partial line\n"))]
+    assert pending == b"next"
+
+
+def test_split_lines_keeps_unterminated_rest():
+    assert split_lines(b"") == ([], b"")
+    assert split_lines(b"a\nb\n") == ([b"a", b"b"], b"")
+    assert split_lines(b"a\nb") == ([b"a"], b"b")
@@ -0,0 +1,138 @@
+# SAFE-AI-FRAMEWORK/backend/upload_engine.py
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from process_registry import STORAGE_DIR, PROJECT_DIR
+
+# relpath -> {"sha256", "size", "mtime_ns"} for files written by the last upload
+HASH_MANIFEST = STORAGE_DIR / "core.hashes.json"
+
+UPLOAD_WORKERS = 8
+CHUNK_SIZE = 1024 * 1024
+
+# -----------------------------------------------------------------------------
+# Hash manifest (lets us trust a file's hash without re-reading it)
+# -----------------------------------------------------------------------------
+def read_manifest() -> Dict[str, Dict]:
+    if HASH_MANIFEST.exists():
+        try:
+            return json.loads(HASH_MANIFEST.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+    return {}
+
+def write_manifest(data: Dict[str, Dict]) -> None:
+    tmp = HASH_MANIFEST.with_name(HASH_MANIFEST.name + ".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, HASH_MANIFEST)
+
+def clear_manifest() -> None:
+    HASH_MANIFEST.unlink(missing_ok=True)
+
+def _hash_stream(f: BinaryIO) -> Tuple[str, int]:
+    h = hashlib.sha256()
+    size = 0
+    while chunk := f.read(CHUNK_SIZE):
+        h.update(chunk)
+        size += len(chunk)
+    return h.hexdigest(), size
+
+def _disk_digest(path: Path, entry: Optional[Dict]) -> Optional[str]:
+    """Hash of the file on disk; taken from the manifest when size+mtime still match."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+        return entry.get("sha256")
+    with path.open("rb") as f:
+        return _hash_stream(f)[0]
+
+# -----------------------------------------------------------------------------
+# Upload sync
+# -----------------------------------------------------------------------------
+def _relative_dest(filename: str) -> Tuple[str, Path]:
+    root = PROJECT_DIR.resolve()
+    dest = (root / filename.replace("\\", "/").lstrip("/")).resolve()
+    if not str(dest).startswith(str(root) + os.sep):
+        raise ValueError(f"Invalid upload path: {filename}")
+    return dest.relative_to(root).as_posix(), dest
+
+def _sync_one(src: BinaryIO, dest: Path, prev: Optional[Dict]) -> Tuple[Dict, bool]:
+    """Write `src` to `dest` unless the file there already has the same content."""
+    src.seek(0)
+    digest, size = _hash_stream(src)
+
+    written = False
+    if not (dest.is_file() and _disk_digest(dest, prev) == digest):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".uploading")
+        src.seek(0)
+        with tmp.open("wb") as out:
+            shutil.copyfileobj(src, out, CHUNK_SIZE)
+        os.replace(tmp, dest)
+        written = True
+
+    st = dest.stat()
+    return {"sha256": digest, "size": size, "mtime_ns": st.st_mtime_ns}, written
+
+def _remove_stale(keep: set) -> int:
+    """Delete files that were not part of this upload, then prune empty folders."""
+    removed = 0
+    root = PROJECT_DIR.resolve()
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        for name in filenames:
+            p = Path(dirpath) / name
+            if p.relative_to(root).as_posix() not in keep:
+                p.unlink(missing_ok=True)
+                removed += 1
+        if Path(dirpath) != root:
+            try:
+                os.rmdir(dirpath)  # only succeeds when empty
+            except OSError:
+                pass
+    return removed
+
+async def sync_upload(files: List[UploadFile]) -> Dict[str, int]:
+    """
+    Make PROJECT_DIR mirror the uploaded files. Files are hashed and written
+    concurrently in worker threads; a file whose content already matches what
+    is on disk is left untouched, so re-uploading a mostly unchanged project
+    only rewrites what changed.
+    """
+    PROJECT_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest()
+
+    # last occurrence wins if the browser sends a path twice
+    targets: Dict[str, Tuple[UploadFile, Path]] = {}
+    for uf in files:
+        rel, dest = _relative_dest(uf.filename or "")
+        targets[rel] = (uf, dest)
+
+    sem = asyncio.Semaphore(UPLOAD_WORKERS)
+
+    async def one(rel: str, uf: UploadFile, dest: Path):
+        async with sem:
+            return rel, *await asyncio.to_thread(_sync_one, uf.file, dest, manifest.get(rel))
+
+    results = await asyncio.gather(*(one(rel, uf, dest) for rel, (uf, dest) in targets.items()))
+
+    new_manifest = {rel: entry for rel, entry, _ in results}
+    removed = await asyncio.to_thread(_remove_stale, set(new_manifest))
+    write_manifest(new_manifest)
+
+    written = [new_manifest[rel]["size"] for rel, _, w in results if w]
+    return {
+        "files": len(results),
+        "written": len(written),
+        "skipped": len(results) - len(written),
+        "removed": removed,
+        "bytes_written": sum(written),
+    }
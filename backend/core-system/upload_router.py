@@ -0,0 +1,360 @@
+# SAFE-AI-FRAMEWORK/backend/upload_router.py
+"""
+Resumable chunked upload of project archives (tar, tar.gz/bz2/xz, zip).
+
+    POST   /core/uploads                     -> start a session, returns upload_id
+    PUT    /core/uploads/{id}/chunks/{n}     -> raw bytes of chunk n (0-based), idempotent
+    GET    /core/uploads/{id}                -> which chunks are still missing (resume)
+    POST   /core/uploads/{id}/commit         -> extract into a staging dir, swap into PROJECT_DIR
+    DELETE /core/uploads/{id}                -> abort
+
+Sessions live under STORAGE_DIR/uploads/<id>, so an interrupted client (or a
+restarted server) can pick up where it left off.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import shutil
+import stat
+import tarfile
+import time
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from process_registry import STORAGE_DIR, PROJECT_DIR, write_meta, project_index
+from upload_engine import clear_manifest
+
+router = APIRouter()
+
+UPLOADS_DIR = STORAGE_DIR / "uploads"
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+SESSION_TTL_SECONDS = 24 * 60 * 60
+COPY_BUFSIZE = 1024 * 1024
+
+# one project swap at a time
+_commit_lock = asyncio.Lock()
+
+# ==============================================================================
+# Models
+# ==============================================================================
+class InitUploadReq(BaseModel):
+    filename: str                                     # e.g. "project.tar.gz" (used to detect the format)
+    size: int = Field(..., ge=1)                      # total archive size in bytes
+    chunk_size: int = Field(8 * 1024 * 1024, ge=64 * 1024, le=MAX_CHUNK_SIZE)
+    sha256: Optional[str] = None                      # optional whole-archive checksum, verified on commit
+    root: str = "core_project"
+
+# ==============================================================================
+# Session helpers
+# ==============================================================================
+def _archive_format(filename: str) -> str:
+    name = filename.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")):
+        return "tar"
+    raise HTTPException(400, detail="Unsupported archive type (use .zip or .tar[.gz|.bz2|.xz])")
+
+def _session_dir(upload_id: str) -> Path:
+    if not upload_id.isalnum():
+        raise HTTPException(400, detail="Invalid upload id")
+    return UPLOADS_DIR / upload_id
+
+def _read_session(upload_id: str) -> dict:
+    meta = _session_dir(upload_id) / "session.json"
+    if not meta.exists():
+        raise HTTPException(404, detail="Unknown upload id")
+    return json.loads(meta.read_text(encoding="utf-8"))
+
+def _chunk_path(upload_id: str, n: int) -> Path:
+    return _session_dir(upload_id) / "chunks" / f"{n:06d}.part"
+
+def _received(session: dict) -> List[int]:
+    chunks = _session_dir(session["upload_id"]) / "chunks"
+    return sorted(int(p.stem) for p in chunks.glob("*.part"))
+
+def _status(session: dict) -> dict:
+    got = set(_received(session))
+    return {
+        "upload_id": session["upload_id"],
+        "chunk_size": session["chunk_size"],
+        "total_chunks": session["total_chunks"],
+        "received": len(got),
+        "missing": [n for n in range(session["total_chunks"]) if n not in got],
+    }
+
+def _require_complete(session: dict) -> None:
+    missing = _status(session)["missing"]
+    if missing:
+        raise HTTPException(409, detail={"message": "Upload incomplete", "missing": missing})
+
+def _prune_expired() -> None:
+    if not UPLOADS_DIR.exists():
+        return
+    cutoff = time.time() - SESSION_TTL_SECONDS
+    for d in UPLOADS_DIR.iterdir():
+        try:
+            # session.json is touched on every chunk, so active uploads stay fresh
+            meta = d / "session.json"
+            if (meta if meta.exists() else d).stat().st_mtime < cutoff:
+                shutil.rmtree(d, ignore_errors=True)
+        except OSError:
+            pass
+
+def _touch_session(upload_id: str) -> None:
+    try:
+        os.utime(_session_dir(upload_id) / "session.json")
+    except OSError:
+        pass
+
+# ==============================================================================
+# Streaming extraction
+# ==============================================================================
+class _ChunkReader(io.RawIOBase):
+    """Reads the chunk files of a session back to back as one stream."""
+
+    def __init__(self, paths: List[Path]):
+        self._paths = list(paths)
+        self._f = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while True:
+            if self._f is None:
+                if not self._paths:
+                    return 0
+                self._f = self._paths.pop(0).open("rb")
+            n = self._f.readinto(b)
+            if n:
+                return n
+            self._f.close()
+            self._f = None
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+        super().close()
+
+def _safe_member_path(dest_root: Path, name: str) -> Optional[Path]:
+    """Target path for an archive member, or None if it would escape dest_root."""
+    parts = [p for p in PurePosixPath(name.replace("\\", "/")).parts if p not in ("", ".", "/")]
+    if not parts or ".." in parts or ":" in parts[0]:
+        return None
+    return dest_root.joinpath(*parts)
+
+def _inside(root: Path, path: str) -> bool:
+    real = os.path.realpath(path)
+    return real == str(root) or real.startswith(str(root) + os.sep)
+
+def _open_target(dest_root: Path, target: Path):
+    """Open a member file for writing, never through a link that leads out of dest_root."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if not _inside(dest_root, str(target.parent)):
+        return None
+    if target.is_symlink():
+        target.unlink()
+    return target.open("wb")
+
+def _set_mode(target: Path, mode: int) -> None:
+    # keep the executable bits (gradlew, mvnw, node_modules/.bin shims)
+    if mode & 0o777:
+        target.chmod((mode & 0o755) | 0o600)
+
+def _symlink(dest_root: Path, target: Path, link: str) -> bool:
+    """Recreate a symlink whose resolved target stays inside dest_root."""
+    if not link or os.path.isabs(link) or link.startswith(("/", "\\")):
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if not _inside(dest_root, os.path.join(os.path.realpath(target.parent), link)):
+        return False
+    try:
+        if target.is_symlink() or target.is_file():
+            target.unlink()
+        os.symlink(link, target)
+    except OSError:     # e.g. no symlink privilege on Windows
+        return False
+    return True
+
+def _extract_tar(stream: io.BufferedReader, dest_root: Path) -> int:
+    files = 0
+    root = Path(os.path.realpath(dest_root))
+    # "r|*" reads the (optionally compressed) archive strictly front to back
+    with tarfile.open(fileobj=stream, mode="r|*") as tf:
+        for member in tf:
+            target = _safe_member_path(root, member.name)
+            if target is None:
+                continue
+            if member.isdir():
+                target.mkdir(parents=True, exist_ok=True)
+            elif member.isfile():
+                out = _open_target(root, target)
+                if out is None:
+                    continue
+                with tf.extractfile(member) as src, out:
+                    shutil.copyfileobj(src, out, COPY_BUFSIZE)
+                _set_mode(target, member.mode)
+                files += 1
+            elif member.issym():
+                if _symlink(root, target, member.linkname):
+                    files += 1
+            # hard links, devices and fifos are skipped on purpose
+    return files
+
+def _extract_zip(archive: Path, dest_root: Path) -> int:
+    files = 0
+    root = Path(os.path.realpath(dest_root))
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            target = _safe_member_path(root, info.filename)
+            if target is None:
+                continue
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            mode = info.external_attr >> 16      # unix mode, when the zip was made on unix
+            if stat.S_ISLNK(mode):
+                if info.file_size <= 4096 and _symlink(root, target, zf.read(info).decode("utf-8", errors="ignore")):
+                    files += 1
+                continue
+            out = _open_target(root, target)
+            if out is None:
+                continue
+            with zf.open(info) as src, out:
+                shutil.copyfileobj(src, out, COPY_BUFSIZE)
+            _set_mode(target, mode)
+            files += 1
+    return files
+
+def _hash_chunks(paths: List[Path]) -> str:
+    h = hashlib.sha256()
+    with io.BufferedReader(_ChunkReader(paths), COPY_BUFSIZE) as r:
+        while block := r.read(COPY_BUFSIZE):
+            h.update(block)
+    return h.hexdigest()
+
+def _commit(session: dict) -> int:
+    upload_id = session["upload_id"]
+    sdir = _session_dir(upload_id)
+    paths = [_chunk_path(upload_id, n) for n in range(session["total_chunks"])]
+
+    if session.get("sha256") and _hash_chunks(paths) != session["sha256"].lower():
+        raise HTTPException(400, detail="Checksum mismatch; re-upload the archive")
+
+    staging = sdir / "extract"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    archive = sdir / "archive.zip"
+    try:
+        if session["format"] == "zip":
+            # zip keeps its index at the end, so it needs one seekable file
+            with io.BufferedReader(_ChunkReader(paths), COPY_BUFSIZE) as src, archive.open("wb") as out:
+                shutil.copyfileobj(src, out, COPY_BUFSIZE)
+            files = _extract_zip(archive, staging)
+        else:
+            with io.BufferedReader(_ChunkReader(paths), COPY_BUFSIZE) as src:
+                files = _extract_tar(src, staging)
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError) as e:
+        raise HTTPException(400, detail=f"Could not extract archive: {e}")
+    finally:
+        # the chunks stay until the swap below, so a failed commit can be retried
+        archive.unlink(missing_ok=True)
+
+    # Swap: both renames stay on the STORAGE_DIR filesystem, so the project is
+    # only missing for the instant between them.
+    old = PROJECT_DIR.with_name(f"{PROJECT_DIR.name}.old-{upload_id}")
+    if PROJECT_DIR.exists():
+        os.replace(PROJECT_DIR, old)
+    os.replace(staging, PROJECT_DIR)
+    shutil.rmtree(old, ignore_errors=True)
+    shutil.rmtree(sdir, ignore_errors=True)
+    return files
+
+# ==============================================================================
+# Endpoints
+# ==============================================================================
+@router.post("")
+def init_upload(req: InitUploadReq):
+    _prune_expired()
+    fmt = _archive_format(req.filename)
+    upload_id = uuid.uuid4().hex
+    sdir = _session_dir(upload_id)
+    (sdir / "chunks").mkdir(parents=True)
+    session = {
+        "upload_id": upload_id,
+        "filename": req.filename,
+        "format": fmt,
+        "size": req.size,
+        "chunk_size": req.chunk_size,
+        "total_chunks": -(-req.size // req.chunk_size),
+        "sha256": req.sha256,
+        "root": req.root,
+        "created": time.time(),
+    }
+    (sdir / "session.json").write_text(json.dumps(session, indent=2), encoding="utf-8")
+    return _status(session)
+
+@router.get("/{upload_id}")
+def upload_status(upload_id: str):
+    return _status(_read_session(upload_id))
+
+@router.put("/{upload_id}/chunks/{n}")
+async def put_chunk(upload_id: str, n: int, request: Request):
+    session = _read_session(upload_id)
+    total = session["total_chunks"]
+    if n < 0 or n >= total:
+        raise HTTPException(400, detail=f"Chunk index out of range (0..{total - 1})")
+    expected = session["chunk_size"] if n < total - 1 else session["size"] - session["chunk_size"] * (total - 1)
+
+    final = _chunk_path(upload_id, n)
+    tmp = final.with_suffix(".tmp")
+    written = 0
+    try:
+        with tmp.open("wb") as out:
+            async for block in request.stream():
+                written += len(block)
+                if written > expected:
+                    break
+                await asyncio.to_thread(out.write, block)
+        if written != expected:
+            tmp.unlink(missing_ok=True)
+            raise HTTPException(400, detail=f"Chunk {n} must be exactly {expected} bytes (got {written})")
+        # a chunk only counts once it is complete on disk; re-sending it is harmless
+        os.replace(tmp, final)
+    except FileNotFoundError:
+        # the session was committed or aborted while this chunk was in flight
+        raise HTTPException(404, detail="Unknown upload id")
+    _touch_session(upload_id)
+    return {"ok": True, "chunk": n, **_status(session)}
+
+@router.post("/{upload_id}/commit")
+async def commit_upload(upload_id: str):
+    _require_complete(_read_session(upload_id))
+
+    async with _commit_lock:
+        # checked again: a commit queued behind another one for the same upload
+        # finds the session already gone (404) instead of failing half way
+        session = _read_session(upload_id)
+        _require_complete(session)
+        files = await asyncio.to_thread(_commit, session)
+        await asyncio.to_thread(project_index.root_replaced)
+    clear_manifest()
+    write_meta({"mode": "archive", "root": session["root"], "files": files, "archive": session["filename"]})
+    return {"ok": True, "message": f"Archive extracted with {files} files.", "files": files}
+
+@router.delete("/{upload_id}")
+def abort_upload(upload_id: str):
+    sdir = _session_dir(upload_id)
+    if not sdir.exists():
+        raise HTTPException(404, detail="Unknown upload id")
+    shutil.rmtree(sdir, ignore_errors=True)
+    return {"ok": True, "aborted": upload_id}
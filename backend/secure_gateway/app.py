@@ -1,13 +1,14 @@
 from __future__ import annotations
 
+import math
 import time
 from typing import Optional
 
 import httpx
 from fastapi import FastAPI, Depends, HTTPException, Request, Body
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import (
     CA_SERVICE_URL,
@@ -15,12 +16,24 @@ from config import (
     ROOT_CA_CACHE_PATH,
     INITIAL_TRUST_SCORE,
     STRICT_CORE_AUTH,
+    RATE_LIMITS,
+    ROUTE_RATE_LIMITS,
+    PROXY_TIMEOUT_SECONDS,
+    PROXY_MAX_CONNECTIONS,
+    PROXY_MAX_KEEPALIVE_CONNECTIONS,
+    PROXY_KEEPALIVE_EXPIRY_SECONDS,
+    PROXY_CACHEABLE_GETS,
 )
-from database import engine, get_db, SessionLocal
-from models import Base, Plugin, RequestLog
-from auth import save_root_ca_cert, load_root_ca_cert, verify_plugin_cert, issue_jwt, verify_jwt_token
-from trust_engine import update_plugin_trust
+from database import init_db, close_db, get_db, SessionLocal
+from models import Plugin
+from auth import save_root_ca_cert, load_root_ca_cert, verify_plugin_cert, issue_jwt
+from auth_cache import PluginSnapshot, plugin_cache, invalidate_plugin, verify_jwt_token_cached
+from log_writer import request_log_writer
+from compaction import log_compactor
+from metrics import registry, REQUEST_LATENCY, PLUGIN_LATENCY, UPSTREAM_LATENCY
 from policy_engine import is_allowed
+from rate_limit import limiter
+from response_cache import CachedResponse, response_cache
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Security Gateway (Auth + Policy + Trust + Proxy)", version="1.0")
@@ -40,10 +53,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
-
 ROOT_CA_CERT = None
 
+# One pooled client for the app's lifetime (keep-alive connections to upstreams)
+HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+
 
 class OnboardRequest(BaseModel):
     plugin_id: str = Field(..., min_length=3, max_length=120)
@@ -61,6 +75,11 @@ class OnboardResponse(BaseModel):
     status: str
 
 
+@app.on_event("startup")
+async def startup_init_db():
+    await init_db()
+
+
 @app.on_event("startup")
 async def startup_load_root_ca():
     global ROOT_CA_CERT
@@ -78,25 +97,77 @@ async def startup_load_root_ca():
     ROOT_CA_CERT = load_root_ca_cert(ROOT_CA_CACHE_PATH)
 
 
-def _get_plugin_from_token(request: Request, db: Session) -> Optional[Plugin]:
+@app.on_event("startup")
+async def startup_log_writer():
+    await request_log_writer.start()
+
+
+@app.on_event("startup")
+async def startup_log_compactor():
+    await log_compactor.start()
+
+
+@app.on_event("startup")
+async def startup_http_client():
+    global HTTP_CLIENT
+    HTTP_CLIENT = httpx.AsyncClient(
+        timeout=PROXY_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=PROXY_MAX_CONNECTIONS,
+            max_keepalive_connections=PROXY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=PROXY_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_log_writer():
+    # drains the write-behind buffer so no request log is lost on shutdown
+    await request_log_writer.stop()
+
+
+@app.on_event("shutdown")
+async def shutdown_log_compactor():
+    await log_compactor.stop()
+
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    if HTTP_CLIENT is not None:
+        await HTTP_CLIENT.aclose()
+
+
+@app.on_event("shutdown")
+async def shutdown_close_db():
+    await close_db()
+
+
+async def _get_plugin_from_token(request: Request) -> Optional[PluginSnapshot]:
     auth_header = request.headers.get("Authorization", "")
     if not auth_header.startswith("Bearer "):
         return None
 
     token = auth_header.split(" ", 1)[1].strip()
-    payload = verify_jwt_token(token)
+    payload = verify_jwt_token_cached(token)
     plugin_id = payload.get("sub")
     if not plugin_id:
         return None
 
-    plugin = db.get(Plugin, plugin_id)
-    if not plugin:
+    plugin = plugin_cache.get(plugin_id)
+    if plugin is not None:
+        return plugin
+
+    async with SessionLocal() as db:
+        row = await db.get(Plugin, plugin_id)
+    if not row:
         raise HTTPException(status_code=401, detail="Unknown plugin_id")
+    plugin = PluginSnapshot(row.plugin_id, row.role, row.status)
+    plugin_cache.set(plugin_id, plugin)
     return plugin
 
 
 @app.post("/onboard", response_model=OnboardResponse)
-def onboard(req: OnboardRequest, db: Session = Depends(get_db)):
+async def onboard(req: OnboardRequest, db: AsyncSession = Depends(get_db)):
     if ROOT_CA_CERT is None:
         raise HTTPException(status_code=500, detail="Root CA not loaded")
 
@@ -105,7 +176,7 @@ def onboard(req: OnboardRequest, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Certificate verification failed: {e}")
 
-    plugin = db.get(Plugin, req.plugin_id)
+    plugin = await db.get(Plugin, req.plugin_id)
     if not plugin:
         plugin = Plugin(
             plugin_id=req.plugin_id,
@@ -117,16 +188,17 @@ def onboard(req: OnboardRequest, db: Session = Depends(get_db)):
             service_base_url=req.service_base_url or "",
         )
         db.add(plugin)
-        db.commit()
-        db.refresh(plugin)
+        await db.commit()
+        await db.refresh(plugin)
     else:
         plugin.name = req.plugin_name or plugin.name
         plugin.role = req.role or plugin.role
         plugin.declared_intent = req.declared_intent or plugin.declared_intent
         if req.service_base_url:
             plugin.service_base_url = req.service_base_url
-        db.commit()
-        db.refresh(plugin)
+        await db.commit()
+        await db.refresh(plugin)
+        invalidate_plugin(plugin.plugin_id)
 
     token = issue_jwt(plugin.plugin_id, plugin.role, plugin.declared_intent, plugin.trust_score)
 
@@ -137,6 +209,24 @@ def onboard(req: OnboardRequest, db: Session = Depends(get_db)):
     )
 
 
+def _rate_limit(plugin: PluginSnapshot, path: str) -> float:
+    """Seconds the plugin must wait before this request is allowed (0.0 = go ahead)."""
+    limits = []
+    if plugin.status in RATE_LIMITS:
+        rate, burst = RATE_LIMITS[plugin.status]
+        limits.append((plugin.plugin_id, rate, burst))
+    if plugin.status in ROUTE_RATE_LIMITS:
+        rate, burst = ROUTE_RATE_LIMITS[plugin.status]
+        route = "/".join(path.split("/", 3)[:3])
+        limits.append(((plugin.plugin_id, route), rate, burst))
+    return limiter.acquire(limits) if limits else 0.0
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.middleware("http")
 async def security_middleware(request: Request, call_next):
     path = request.url.path
@@ -155,17 +245,21 @@ async def security_middleware(request: Request, call_next):
 
     plugin = None
     if needs_auth:
-        db = SessionLocal()
-        try:
-            plugin = _get_plugin_from_token(request, db)
-            if not plugin:
-                raise HTTPException(status_code=401, detail="Missing/invalid JWT")
-
-            allowed, reason = is_allowed(plugin, path, request.method)
-            if not allowed:
-                raise HTTPException(status_code=403, detail=reason)
-        finally:
-            db.close()
+        plugin = await _get_plugin_from_token(request)
+        if not plugin:
+            raise HTTPException(status_code=401, detail="Missing/invalid JWT")
+
+        allowed, reason = is_allowed(plugin, path, request.method)
+        if not allowed:
+            raise HTTPException(status_code=403, detail=reason)
+
+        retry_after = _rate_limit(plugin, path)
+        if retry_after:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
 
     start = time.perf_counter()
     status_code = 500
@@ -180,48 +274,96 @@ async def security_middleware(request: Request, call_next):
         error_flag = True
         raise
     finally:
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        REQUEST_LATENCY.observe(latency_ms, path, request.method)
         if plugin and (path.startswith("/core/") or path.startswith("/plugins/")):
-            latency_ms = (time.perf_counter() - start) * 1000.0
-            db = SessionLocal()
-            try:
-                db.add(
-                    RequestLog(
-                        plugin_id=plugin.plugin_id,
-                        path=path,
-                        method=request.method,
-                        status_code=status_code,
-                        latency_ms=latency_ms,
-                        error_flag=error_flag,
-                    )
-                )
-                db.commit()
-                update_plugin_trust(db, plugin.plugin_id)
-            finally:
-                db.close()
+            PLUGIN_LATENCY.observe(latency_ms, plugin.plugin_id)
+            await request_log_writer.submit(
+                plugin_id=plugin.plugin_id,
+                path=path,
+                method=request.method,
+                status_code=status_code,
+                latency_ms=latency_ms,
+                error_flag=error_flag,
+            )
 
     return response
 
 
-async def _proxy_request(request: Request, target_base: str, target_path: str) -> Response:
-    method = request.method
-    body = await request.body()
+# Hop-by-hop headers are connection-specific and must not be forwarded.
+_HOP_BY_HOP_HEADERS = {
+    "host", "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade",
+}
 
-    headers = dict(request.headers)
-    headers.pop("host", None)
+# Upstream response headers passed back to the caller (CORS is handled by the gateway itself).
+_PASSTHROUGH_RESPONSE_HEADERS = {
+    "content-type", "content-length", "content-encoding", "content-disposition",
+    "content-range", "accept-ranges", "etag", "last-modified", "cache-control",
+}
+
+
+async def _proxy_request(request: Request, target_base: str, target_path: str) -> Response:
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS}
 
     url = f"{target_base}{target_path}"
     if request.url.query:
         url = f"{url}?{request.url.query}"
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.request(method, url, content=body, headers=headers)
+    # Stream the body through instead of buffering it (bodyless requests send none).
+    has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+    upstream = HTTP_CLIENT.build_request(
+        request.method, url, headers=headers, content=request.stream() if has_body else None
+    )
+    start = time.perf_counter()
+    try:
+        resp = await HTTP_CLIENT.send(upstream, stream=True)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Upstream request failed: {e}")
+    finally:
+        UPSTREAM_LATENCY.observe((time.perf_counter() - start) * 1000.0, target_base)
 
-    content_type = resp.headers.get("content-type", "application/json")
-    return Response(content=resp.content, status_code=resp.status_code, media_type=content_type)
+    async def body():
+        try:
+            async for chunk in resp.aiter_raw():
+                yield chunk
+        finally:
+            await resp.aclose()  # hand the connection back to the pool
 
+    out_headers = {k: v for k, v in resp.headers.items() if k.lower() in _PASSTHROUGH_RESPONSE_HEADERS}
+    out_headers.setdefault("content-type", "application/json")
+    return StreamingResponse(body(), status_code=resp.status_code, headers=out_headers)
 
-def _ensure_plugin_row(db: Session, slug: str):
-    plugin = db.get(Plugin, slug)
+
+async def _proxy_cached_get(request: Request, target_base: str, target_path: str, ttl: float) -> Response:
+    url = f"{target_base}{target_path}"
+    if request.url.query:
+        url = f"{url}?{request.url.query}"
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS}
+
+    async def load() -> CachedResponse:
+        start = time.perf_counter()
+        try:
+            resp = await HTTP_CLIENT.get(url, headers=headers)
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=502, detail=f"Upstream request failed: {e}")
+        finally:
+            UPSTREAM_LATENCY.observe((time.perf_counter() - start) * 1000.0, target_base)
+        # body is already decoded, so its length/encoding headers no longer apply
+        out_headers = {
+            k: v for k, v in resp.headers.items()
+            if k.lower() in _PASSTHROUGH_RESPONSE_HEADERS and k.lower() not in ("content-length", "content-encoding")
+        }
+        out_headers.setdefault("content-type", "application/json")
+        return CachedResponse(resp.status_code, out_headers, resp.content)
+
+    use_cache = "no-cache" not in request.headers.get("cache-control", "").lower()
+    cached = await response_cache.fetch((target_path, request.url.query), ttl, load, use_cache=use_cache)
+    return Response(content=cached.body, status_code=cached.status_code, headers=cached.headers)
+
+
+async def _ensure_plugin_row(db: AsyncSession, slug: str):
+    plugin = await db.get(Plugin, slug)
     if not plugin:
         plugin = Plugin(
             plugin_id=slug,                 # use slug as plugin_id for tracking
@@ -233,42 +375,39 @@ def _ensure_plugin_row(db: Session, slug: str):
             service_base_url=""
         )
         db.add(plugin)
-        db.commit()
-        db.refresh(plugin)
+        await db.commit()
+        await db.refresh(plugin)
     return plugin
 
 
 @app.post("/core/plugins/start")
-async def proxy_plugins_start(request: Request, db: Session = Depends(get_db)):
+async def proxy_plugins_start(request: Request, db: AsyncSession = Depends(get_db)):
     payload = await request.json()
     slug = payload.get("slug", "unknown")
 
-    _ensure_plugin_row(db, slug)
+    await _ensure_plugin_row(db, slug)
 
     start = time.perf_counter()
     resp = await _proxy_request(request, CORE_SYSTEM_URL, "/core/plugins/start")
     latency_ms = (time.perf_counter() - start) * 1000.0
 
-    db.add(RequestLog(
+    await request_log_writer.submit(
         plugin_id=slug,
         path="/core/plugins/start",
         method="POST",
         status_code=resp.status_code,
         latency_ms=latency_ms,
         error_flag=resp.status_code >= 400,
-    ))
-    db.commit()
-
-    update_plugin_trust(db, slug)
+    )
     return resp
 
 
 @app.post("/core/plugins/run")
-async def proxy_plugins_run(request: Request, db: Session = Depends(get_db)):
+async def proxy_plugins_run(request: Request, db: AsyncSession = Depends(get_db)):
     payload = await request.json()
     slug = payload.get("slug", "unknown")
 
-    plugin = _ensure_plugin_row(db, slug)
+    plugin = await _ensure_plugin_row(db, slug)
 
     # Optional enforcement (only if you want):
     if plugin.status == "blocked":
@@ -278,45 +417,101 @@ async def proxy_plugins_run(request: Request, db: Session = Depends(get_db)):
     resp = await _proxy_request(request, CORE_SYSTEM_URL, "/core/plugins/run")
     latency_ms = (time.perf_counter() - start) * 1000.0
 
-    db.add(RequestLog(
+    await request_log_writer.submit(
         plugin_id=slug,
         path="/core/plugins/run",
         method="POST",
         status_code=resp.status_code,
         latency_ms=latency_ms,
         error_flag=resp.status_code >= 400,
-    ))
-    db.commit()
-
-    update_plugin_trust(db, slug)
+    )
     return resp
 
 
+@app.post("/core/plugins/run-batch")
+async def proxy_plugins_run_batch(request: Request, db: AsyncSession = Depends(get_db)):
+    payload = await request.json()
+    items = payload.get("items") if isinstance(payload.get("items"), list) else []
+    slugs = [
+        (item.get("slug") if isinstance(item, dict) else None) or payload.get("slug") or "unknown"
+        for item in items
+    ]
+
+    # every plugin in the batch goes through the same policy as a single run
+    for slug in dict.fromkeys(slugs):
+        plugin = await _ensure_plugin_row(db, slug)
+        if plugin.status == "blocked":
+            raise HTTPException(status_code=403, detail=f"Plugin '{slug}' blocked by trust policy")
+
+    url = f"{CORE_SYSTEM_URL}/core/plugins/run-batch"
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS}
+    start = time.perf_counter()
+    try:
+        upstream = await HTTP_CLIENT.post(url, headers=headers, content=await request.body())
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=502, detail=f"Upstream request failed: {e}")
+    finally:
+        UPSTREAM_LATENCY.observe((time.perf_counter() - start) * 1000.0, CORE_SYSTEM_URL)
+    latency_ms = (time.perf_counter() - start) * 1000.0
+
+    # one trust log row per item, with that item's own outcome when the core reports it
+    results = None
+    if upstream.status_code < 400:
+        try:
+            results = upstream.json().get("results")
+        except ValueError:
+            results = None
+    if not isinstance(results, list) or len(results) != len(slugs):
+        results = None
+    for i, slug in enumerate(slugs):
+        r = results[i] if results else {}
+        status_code = (200 if r.get("ok") else int(r.get("status") or 500)) if results else upstream.status_code
+        await request_log_writer.submit(
+            plugin_id=slug,
+            path="/core/plugins/run-batch",
+            method="POST",
+            status_code=status_code,
+            latency_ms=float(r.get("ms") or 0.0) if results else latency_ms,
+            error_flag=status_code >= 400,
+        )
+
+    out_headers = {
+        k: v for k, v in upstream.headers.items()
+        if k.lower() in _PASSTHROUGH_RESPONSE_HEADERS and k.lower() not in ("content-length", "content-encoding")
+    }
+    out_headers.setdefault("content-type", "application/json")
+    return Response(content=upstream.content, status_code=upstream.status_code, headers=out_headers)
+
+
 @app.post("/core/plugins/stop")
-async def proxy_plugins_stop(request: Request, db: Session = Depends(get_db)):
+async def proxy_plugins_stop(request: Request, db: AsyncSession = Depends(get_db)):
     payload = await request.json()
     slug = payload.get("slug", "unknown")
 
-    _ensure_plugin_row(db, slug)
+    await _ensure_plugin_row(db, slug)
 
     start = time.perf_counter()
     resp = await _proxy_request(request, CORE_SYSTEM_URL, "/core/plugins/stop")
     latency_ms = (time.perf_counter() - start) * 1000.0
 
-    db.add(RequestLog(
+    await request_log_writer.submit(
         plugin_id=slug,
         path="/core/plugins/stop",
         method="POST",
         status_code=resp.status_code,
         latency_ms=latency_ms,
         error_flag=resp.status_code >= 400,
-    ))
-    db.commit()
-
-    update_plugin_trust(db, slug)
+    )
     return resp
 
 
 @app.api_route("/core/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
 async def core_proxy(path: str, request: Request):
-    return await _proxy_request(request, CORE_SYSTEM_URL, f"/core/{path}")
\ No newline at end of file
+    target_path = f"/core/{path}"
+    if request.method == "GET" and target_path in PROXY_CACHEABLE_GETS:
+        return await _proxy_cached_get(request, CORE_SYSTEM_URL, target_path, PROXY_CACHEABLE_GETS[target_path])
+
+    resp = await _proxy_request(request, CORE_SYSTEM_URL, target_path)
+    if request.method != "GET":
+        response_cache.invalidate()  # a write may change what the cached GETs return
+    return resp
\ No newline at end of file
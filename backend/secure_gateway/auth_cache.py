@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+from config import (
+    TOKEN_CACHE_MAX_ENTRIES,
+    TOKEN_CACHE_TTL_SECONDS,
+    PLUGIN_CACHE_MAX_ENTRIES,
+    PLUGIN_CACHE_TTL_SECONDS,
+)
+from auth import verify_jwt_token
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a TTL. Thread-safe."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class PluginSnapshot(NamedTuple):
+    """The fields of a Plugin row the auth/policy path needs."""
+    plugin_id: str
+    role: str
+    status: str
+
+
+# token digest -> verified claims
+token_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+
+# plugin_id -> PluginSnapshot
+plugin_cache = TTLCache(PLUGIN_CACHE_MAX_ENTRIES, PLUGIN_CACHE_TTL_SECONDS)
+
+
+def verify_jwt_token_cached(token: str) -> Dict[str, Any]:
+    """
+    verify_jwt_token with a cache in front. Only successfully verified tokens
+    are cached, and never past their own `exp`.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = token_cache.get(key)
+    if claims is not None:
+        return claims
+
+    claims = verify_jwt_token(token)
+    exp = claims.get("exp")
+    ttl = (exp - time.time()) if exp is not None else None
+    token_cache.set(key, claims, ttl)
+    return claims
+
+
+def invalidate_plugin(plugin_id: str) -> None:
+    plugin_cache.pop(plugin_id)
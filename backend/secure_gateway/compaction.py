@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from config import (
+    LOG_RETENTION_SECONDS,
+    LOG_COMPACTION_INTERVAL_SECONDS,
+    LOG_COMPACTION_BATCH_ROWS,
+    LOG_VACUUM_PAGES,
+    LATENCY_BUCKETS_MS,
+    TRUST_WINDOW_SECONDS,
+)
+from database import engine, SessionLocal
+from models import RequestLog, RequestLogRollup
+
+UTC = timezone.utc
+
+
+def _new_rollup(plugin_id: str, minute: datetime) -> RequestLogRollup:
+    return RequestLogRollup(
+        plugin_id=plugin_id,
+        minute=minute,
+        count=0,
+        errors=0,
+        latency_sum_ms=0.0,
+        latency_max_ms=0.0,
+        latency_histogram=json.dumps([0] * (len(LATENCY_BUCKETS_MS) + 1)),
+    )
+
+
+async def compact_request_logs(now: Optional[datetime] = None) -> int:
+    """
+    Fold raw request_logs older than the retention horizon into per-plugin
+    per-minute RequestLogRollup rows and delete them, one chunk (and one
+    transaction) at a time so the log writer is never locked out for long.
+    Returns the number of raw rows compacted.
+    """
+    retention = max(LOG_RETENTION_SECONDS, TRUST_WINDOW_SECONDS)
+    cutoff = (now or datetime.now(UTC)) - timedelta(seconds=retention)
+    compacted = 0
+
+    while True:
+        async with SessionLocal() as db:
+            # oldest rows have the lowest ids, so this walks the primary key from the start
+            rows = (await db.execute(
+                select(
+                    RequestLog.id,
+                    RequestLog.plugin_id,
+                    RequestLog.created_at,
+                    RequestLog.error_flag,
+                    RequestLog.latency_ms,
+                )
+                .where(RequestLog.created_at < cutoff)
+                .order_by(RequestLog.id)
+                .limit(LOG_COMPACTION_BATCH_ROWS)
+            )).all()
+            if not rows:
+                break
+
+            keys = {(r.plugin_id, r.created_at.replace(second=0, microsecond=0)) for r in rows}
+            existing = (await db.execute(
+                select(RequestLogRollup).where(
+                    RequestLogRollup.plugin_id.in_({k[0] for k in keys}),
+                    RequestLogRollup.minute.in_({k[1] for k in keys}),
+                )
+            )).scalars().all()
+
+            rollups: Dict[Tuple[str, datetime], RequestLogRollup] = {
+                (r.plugin_id, r.minute): r for r in existing
+            }
+            histograms = {key: json.loads(r.latency_histogram) for key, r in rollups.items()}
+
+            for r in rows:
+                key = (r.plugin_id, r.created_at.replace(second=0, microsecond=0))
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = _new_rollup(*key)
+                    histograms[key] = json.loads(rollup.latency_histogram)
+                    db.add(rollup)
+                rollup.count += 1
+                rollup.errors += 1 if r.error_flag else 0
+                rollup.latency_sum_ms += r.latency_ms
+                rollup.latency_max_ms = max(rollup.latency_max_ms, r.latency_ms)
+                histograms[key][bisect_left(LATENCY_BUCKETS_MS, r.latency_ms)] += 1
+
+            for key, hist in histograms.items():
+                rollups[key].latency_histogram = json.dumps(hist)
+
+            await db.execute(delete(RequestLog).where(RequestLog.id.in_([r.id for r in rows])))
+            await db.commit()
+
+        compacted += len(rows)
+        if len(rows) < LOG_COMPACTION_BATCH_ROWS:
+            break
+        await asyncio.sleep(0)  # let request handling run between chunks
+
+    return compacted
+
+
+async def incremental_vacuum() -> None:
+    """Give freed pages back to the filesystem (SQLite only)."""
+    if engine.dialect.name != "sqlite":
+        return
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+            return  # init_db converts the database at startup; never VACUUM it live
+        await conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(LOG_VACUUM_PAGES)})")
+
+
+class LogCompactor:
+    """Background task running compaction + incremental VACUUM every `interval` seconds."""
+
+    def __init__(self, interval: float = LOG_COMPACTION_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> int:
+        compacted = await compact_request_logs()
+        await incremental_vacuum()
+        return compacted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"[gateway] request log compaction failed: {e}")
+
+
+log_compactor = LogCompactor()
@@ -1,20 +1,65 @@
 from __future__ import annotations
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from config import DB_PATH
-
-engine = create_engine(
-    f"sqlite:///{DB_PATH}",
-    connect_args={"check_same_thread": False},
-    future=True,
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS
+from models import Base
+
+_is_sqlite = DATABASE_URL.startswith("sqlite")
+
+engine = create_async_engine(
+    DATABASE_URL,
+    # aiosqlite defaults to NullPool (a new connection + thread per session); keep a pool instead
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_pre_ping=not _is_sqlite,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+if _is_sqlite:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        # WAL lets readers proceed while the log writer commits; NORMAL sync is
+        # durable across app crashes and only fsyncs at checkpoints.
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA busy_timeout=5000")
+        cur.close()
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def _enable_incremental_vacuum() -> None:
+    """
+    Switch SQLite to auto_vacuum=INCREMENTAL. The mode only changes through a
+    VACUUM (the WAL header is already written), so it runs here once at
+    startup, before traffic, and the periodic compactor never locks the live
+    database for a full rewrite. On a new file the VACUUM is instant.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() == 2:
+            return
+        if (await conn.exec_driver_sql("SELECT count(*) FROM sqlite_master")).scalar():
+            print("[gateway] converting the database to incremental auto_vacuum (one-time VACUUM)")
+        await conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        await conn.exec_driver_sql("VACUUM")
+
+
+async def init_db() -> None:
+    if _is_sqlite:
+        await _enable_incremental_vacuum()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db() -> None:
+    # pooled aiosqlite connections each own a thread; release them on shutdown
+    await engine.dispose()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from config import LOG_FLUSH_INTERVAL_MS, LOG_FLUSH_MAX_ROWS, LOG_BUFFER_MAX_ROWS
+from database import SessionLocal
+from metrics import LOG_FLUSH_LATENCY, TRUST_UPDATE_LATENCY
+from models import RequestLog
+from auth_cache import invalidate_plugin
+from trust_engine import mark_trust_saved, record_request, update_plugin_trust
+
+UTC = timezone.utc
+
+
+class RequestLogWriter:
+    """
+    Write-behind buffer for RequestLog rows.
+
+    Requests only enqueue a row; a single background task drains the queue and
+    inserts rows in one executemany transaction every `interval_ms` or every
+    `batch_size` rows, whichever comes first. The queue is bounded, so when the
+    database falls behind, `submit` waits for room instead of growing memory.
+    """
+
+    def __init__(
+        self,
+        interval_ms: int = LOG_FLUSH_INTERVAL_MS,
+        batch_size: int = LOG_FLUSH_MAX_ROWS,
+        max_buffer: int = LOG_BUFFER_MAX_ROWS,
+    ):
+        self.interval = interval_ms / 1000.0
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything buffered so far and stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)  # sentinel: everything queued before it gets written
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def submit(
+        self,
+        plugin_id: str,
+        path: str,
+        method: str,
+        status_code: int,
+        latency_ms: float,
+        error_flag: bool,
+    ) -> None:
+        row = {
+            "plugin_id": plugin_id,
+            "path": path,
+            "method": method,
+            "status_code": status_code,
+            "latency_ms": latency_ms,
+            "error_flag": error_flag,
+            "created_at": datetime.now(UTC),
+        }
+        if self._task is None:
+            # Not started (or already shut down): write through so nothing is lost.
+            await self._write([row])
+            return
+        await self._queue.put(row)  # blocks the caller only while the buffer is full
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            await self._write(batch)
+        except Exception as e:
+            # Logging must never take the gateway down; drop the batch and keep going.
+            print(f"[gateway] request log flush failed ({len(batch)} rows): {e}")
+
+    @staticmethod
+    async def _write(batch: List[Dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        async with SessionLocal() as db:
+            # One trust step per logged request, in arrival order. Done before the
+            # insert so a plugin's window seeded from disk doesn't see this batch twice.
+            for row in batch:
+                await record_request(db, row["plugin_id"], row["error_flag"], row["latency_ms"], row["created_at"])
+            TRUST_UPDATE_LATENCY.observe((time.perf_counter() - start) * 1000.0)
+            await db.execute(insert(RequestLog), batch)
+            written = {}
+            for pid in {row["plugin_id"] for row in batch}:
+                values = await update_plugin_trust(db, pid)
+                if values is not None:
+                    written[pid] = values
+            await db.commit()
+            for plugin_id, (score, status) in written.items():
+                mark_trust_saved(plugin_id, score, status)
+                # the auth path caches plugin status; make it re-read the new one
+                invalidate_plugin(plugin_id)
+        LOG_FLUSH_LATENCY.observe((time.perf_counter() - start) * 1000.0)
+
+
+request_log_writer = RequestLogWriter()
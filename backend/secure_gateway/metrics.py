@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+from config import LATENCY_BUCKETS_MS, METRICS_MAX_SERIES
+
+OVERFLOW_LABEL = "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Recording is a bisect plus two additions;
+    buckets are only made cumulative when rendered. The number of label sets
+    is capped at `max_series`; anything beyond is folded into an "other" series
+    so unbounded values (paths, plugin ids) can't grow memory.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_MS,
+        max_series: int = METRICS_MAX_SERIES,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.max_series = max_series
+        # label values -> [per-bucket counts..., overflow count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        key = tuple(labelvalues)
+        series = self._series.get(key)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                key = (OVERFLOW_LABEL,) * len(self.labelnames)
+                series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            labels = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = "+Inf" if bound == "+Inf" else _fmt(bound)
+                bucket_labels = ",".join([*labels, f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {_fmt(total[0])}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[Histogram] = []
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Histogram:
+        h = Histogram(name, help, labelnames)
+        self._metrics.append(h)
+        return h
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "gateway_request_duration_ms", "Gateway request latency by path and method", ("path", "method")
+)
+PLUGIN_LATENCY = registry.histogram(
+    "gateway_plugin_request_duration_ms", "Latency of authenticated plugin requests", ("plugin_id",)
+)
+UPSTREAM_LATENCY = registry.histogram(
+    "gateway_upstream_duration_ms", "Time until upstream response headers", ("upstream",)
+)
+LOG_FLUSH_LATENCY = registry.histogram(
+    "gateway_log_flush_duration_ms", "Request log batch flush time (insert + trust + commit)"
+)
+TRUST_UPDATE_LATENCY = registry.histogram(
+    "gateway_trust_update_duration_ms", "Trust window update time per flushed batch"
+)
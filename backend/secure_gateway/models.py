@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Float, DateTime, Integer, Boolean, Index
+from sqlalchemy import String, Float, DateTime, Integer, Boolean, Index, Text
 
 UTC = timezone.utc
 
@@ -41,4 +41,22 @@ class RequestLog(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(UTC))
 
 
-Index("idx_logs_plugin_time", RequestLog.plugin_id, RequestLog.created_at)
\ No newline at end of file
+Index("idx_logs_plugin_time", RequestLog.plugin_id, RequestLog.created_at)
+
+
+class RequestLogRollup(Base):
+    """Per-plugin, per-minute summary of RequestLog rows that aged out of retention."""
+    __tablename__ = "request_log_rollups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    plugin_id: Mapped[str] = mapped_column(String(120))
+    minute: Mapped[datetime] = mapped_column(DateTime)  # UTC, truncated to the minute
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    errors: Mapped[int] = mapped_column(Integer, default=0)
+    latency_sum_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    latency_max_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    # JSON list of counts per LATENCY_BUCKETS_MS bucket, plus a final overflow bucket
+    latency_histogram: Mapped[str] = mapped_column(Text, default="[]")
+
+
+Index("idx_rollups_plugin_minute", RequestLogRollup.plugin_id, RequestLogRollup.minute, unique=True)
\ No newline at end of file
@@ -1,27 +1,130 @@
+"""
+Policy file format (policy.json):
+
+    {
+      "default": {"effect": "allow", "reason": "Allowed"},
+      "rules": [
+        {"status": ["restricted"], "roles": ["*"], "methods": ["POST"],
+         "prefixes": ["/core/save"], "effect": "deny",
+         "reason": "Restricted plugin cannot access {prefix}"}
+      ]
+    }
+
+`status`, `roles` and `methods` default to "any"; `prefix` (or a list in
+`prefixes`) is matched with str.startswith semantics, "" matching every path.
+The rule on the longest matching prefix wins; rules on the same prefix are
+tried in file order.
+"""
+
 from __future__ import annotations
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import POLICY_PATH, POLICY_DECISION_CACHE_SIZE
 from models import Plugin
+from auth_cache import PluginSnapshot
+
+
+class _Rule:
+    __slots__ = ("statuses", "roles", "methods", "allowed", "reason")
+
+    def __init__(self, spec: Dict[str, Any], prefix: str):
+        self.statuses = _any_or_set(spec.get("status"))
+        self.roles = _any_or_set(spec.get("roles"))
+        self.methods = _any_or_set(spec.get("methods"), upper=True)
+        effect = spec.get("effect", "deny")
+        if effect not in ("allow", "deny"):
+            raise ValueError(f"Invalid policy effect: {effect!r}")
+        self.allowed = effect == "allow"
+        default_reason = "Allowed" if self.allowed else f"Denied by policy for {prefix or '/'}"
+        self.reason = spec.get("reason", default_reason).format(prefix=prefix)
+
+    def matches(self, status: str, role: str, method: str) -> bool:
+        return (
+            (self.statuses is None or status in self.statuses)
+            and (self.roles is None or role in self.roles)
+            and (self.methods is None or method in self.methods)
+        )
+
+
+def _any_or_set(values: Optional[List[str]], upper: bool = False) -> Optional[frozenset]:
+    if not values or "*" in values:
+        return None
+    return frozenset(v.upper() if upper else v for v in values)
+
+
+class _Node:
+    __slots__ = ("children", "rules")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.rules: List[_Rule] = []
+
+
+class PolicySet:
+    """
+    Rules compiled into a character trie keyed by path prefix, so a decision
+    is one walk over the path no matter how many rules there are. Decisions
+    are memoized per (status, role, method, path template), where the template
+    is the path cut at the longest rule prefix: nothing past it can change the
+    outcome.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        default = spec.get("default") or {}
+        self.default = (default.get("effect", "allow") == "allow", default.get("reason", "Allowed"))
+        self._root = _Node()
+        self._depth = 0
+
+        for rule_spec in spec.get("rules", []):
+            prefixes = rule_spec.get("prefixes")
+            if prefixes is None:
+                prefixes = [rule_spec.get("prefix", "")]
+            for prefix in prefixes:
+                node = self._root
+                for ch in prefix:
+                    node = node.children.setdefault(ch, _Node())
+                node.rules.append(_Rule(rule_spec, prefix))
+                self._depth = max(self._depth, len(prefix))
+
+        self._decide = lru_cache(maxsize=POLICY_DECISION_CACHE_SIZE)(self._walk)
+
+    def _walk(self, status: str, role: str, method: str, template: str) -> tuple[bool, str]:
+        decision = None
+        node = self._root
+        i = 0
+        while True:
+            for rule in node.rules:
+                if rule.matches(status, role, method):
+                    decision = (rule.allowed, rule.reason)
+                    break
+            if i == len(template):
+                break
+            node = node.children.get(template[i])
+            if node is None:
+                break
+            i += 1
+        return decision or self.default
+
+    def evaluate(self, status: str, role: str, method: str, path: str) -> tuple[bool, str]:
+        return self._decide(status, role or "", method.upper(), path[: self._depth])
+
+
+def load_policy(path: Path = POLICY_PATH) -> PolicySet:
+    return PolicySet(json.loads(path.read_text(encoding="utf-8")))
+
+
+_policy = load_policy()
+
+
+def reload_policy(path: Path = POLICY_PATH) -> None:
+    """Re-read the policy file; the decision cache starts empty again."""
+    global _policy
+    _policy = load_policy(path)
+
 
-WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
-
-RESTRICTED_DENY_PREFIXES = (
-    "/core/upload-folder",
-    "/core/save",
-    "/core/delete",
-    "/core/reset",
-    "/core/stop",
-    "/core/start",
-    "/core/docker",
-)
-
-def is_allowed(plugin: Plugin, path: str, method: str) -> tuple[bool, str]:
-    if plugin.status == "blocked":
-        return False, "Plugin is blocked by policy"
-
-    if plugin.status == "restricted":
-        for prefix in RESTRICTED_DENY_PREFIXES:
-            if path.startswith(prefix):
-                return False, f"Restricted plugin cannot access {prefix}"
-        if method.upper() in WRITE_METHODS:
-            return False, "Restricted plugin cannot perform write operations"
-
-    return True, "Allowed"
\ No newline at end of file
+def is_allowed(plugin: Plugin | PluginSnapshot, path: str, method: str) -> tuple[bool, str]:
+    return _policy.evaluate(plugin.status, plugin.role, method, path)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from config import RATE_LIMIT_MAX_BUCKETS
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by arbitrary hashables, refilled lazily on access
+    (O(1) per check). At most `max_buckets` are kept; the least recently used
+    are dropped first, which at worst hands an idle key a fresh, full bucket.
+    """
+
+    def __init__(self, max_buckets: int = RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()  # key -> [tokens, last_refill]
+
+    def _bucket(self, key: Hashable, rate: float, burst: float, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now]
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+
+    def acquire(self, limits: List[Tuple[Hashable, float, float]], now: Optional[float] = None) -> float:
+        """
+        Take one token from every (key, rate, burst) bucket, or from none of
+        them. Returns 0.0 on success, otherwise the seconds until a retry
+        could succeed.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = [(self._bucket(key, rate, burst, now), rate) for key, rate, burst in limits]
+
+        wait = 0.0
+        for (tokens, _), rate in buckets:
+            if tokens < 1.0:
+                wait = max(wait, (1.0 - tokens) / rate if rate > 0 else math.inf)
+        if wait > 0.0:
+            return wait
+
+        for bucket, _ in buckets:
+            bucket[0] -= 1.0
+        return 0.0
+
+
+limiter = TokenBucketLimiter()
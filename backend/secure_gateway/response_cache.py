@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+from config import PROXY_CACHE_MAX_ENTRIES
+from auth_cache import TTLCache
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+def cache_ttl(default_ttl: float, cache_control: str) -> float:
+    """How long a response may be reused, honouring upstream Cache-Control."""
+    cc = cache_control.lower()
+    if "no-store" in cc or "no-cache" in cc or "private" in cc:
+        return 0.0
+    m = _MAX_AGE_RE.search(cc)
+    if m:
+        return min(default_ttl, float(m.group(1)))
+    return default_ttl
+
+
+class SingleFlightCache:
+    """
+    Coalesces identical concurrent upstream GETs into one request and keeps
+    successful responses for a short TTL. Callers that arrive while a fetch
+    is in flight await the same task; a caller being cancelled does not
+    cancel the shared fetch.
+    """
+
+    def __init__(self, max_entries: int = PROXY_CACHE_MAX_ENTRIES):
+        # TTLCache caps each entry at its own ttl, so the global one is only an upper bound
+        self._cache = TTLCache(max_entries, ttl=float("inf"))
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def fetch(
+        self,
+        key: Hashable,
+        ttl: float,
+        loader: Callable[[], Awaitable[CachedResponse]],
+        use_cache: bool = True,
+    ) -> CachedResponse:
+        if use_cache:
+            hit = self._cache.get(key)
+            if hit is not None:
+                return hit
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, ttl, loader))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, ttl: float, loader) -> CachedResponse:
+        try:
+            resp = await loader()
+            if resp.status_code == 200:
+                ttl = cache_ttl(ttl, resp.headers.get("cache-control", ""))
+                if ttl > 0:
+                    self._cache.set(key, resp, ttl)
+            return resp
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key)
+
+
+response_cache = SingleFlightCache()
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import select, func
+from sqlalchemy import select, update
 
 from config import (
     TRUST_WINDOW_SECONDS,
@@ -9,6 +10,7 @@ from config import (
     TRUST_MAX,
     ACTIVE_THRESHOLD,
     RESTRICTED_THRESHOLD,
+    TRUST_STATE_MAX_PLUGINS,
 )
 from models import Plugin, RequestLog
 
@@ -27,41 +29,12 @@ def _status_from_score(score: float) -> str:
     return "blocked"
 
 
-def update_plugin_trust(db, plugin_id: str) -> Plugin | None:
-    plugin = db.get(Plugin, plugin_id)
-    if not plugin:
-        return None
-
-    window_start = datetime.now(UTC) - timedelta(seconds=TRUST_WINDOW_SECONDS)
-
-    total = db.execute(
-        select(func.count(RequestLog.id)).where(
-            RequestLog.plugin_id == plugin_id,
-            RequestLog.created_at >= window_start,
-        )
-    ).scalar_one()
-
+def _next_score(score: float, total: int, errors: int, latency_sum: float) -> float:
     if total == 0:
-        plugin.status = _status_from_score(plugin.trust_score)
-        db.commit()
-        return plugin
-
-    errors = db.execute(
-        select(func.count(RequestLog.id)).where(
-            RequestLog.plugin_id == plugin_id,
-            RequestLog.created_at >= window_start,
-            RequestLog.error_flag == True,  # noqa
-        )
-    ).scalar_one()
-
-    avg_latency = db.execute(
-        select(func.avg(RequestLog.latency_ms)).where(
-            RequestLog.plugin_id == plugin_id,
-            RequestLog.created_at >= window_start,
-        )
-    ).scalar_one() or 0.0
+        return score
 
     error_rate = errors / float(total)
+    avg_latency = latency_sum / total
 
     delta = 0.0
     delta -= error_rate * 30.0
@@ -72,9 +45,164 @@ def update_plugin_trust(db, plugin_id: str) -> Plugin | None:
     if error_rate == 0.0 and total < 20:
         delta += 2.0
 
-    new_score = _clamp(plugin.trust_score + delta, TRUST_MIN, TRUST_MAX)
-    plugin.trust_score = new_score
-    plugin.status = _status_from_score(new_score)
+    return _clamp(score + delta, TRUST_MIN, TRUST_MAX)
+
+
+class SlidingWindow:
+    """
+    Ring buffer of per-second buckets (request count, error count, latency sum)
+    covering the last `seconds` seconds. Running sums are kept alongside the
+    buckets, so recording an event and reading the totals are both O(1)
+    (amortized over the seconds that elapse between calls).
+    """
+
+    __slots__ = ("size", "head", "total", "errors", "latency_sum", "_totals", "_errors", "_latency")
+
+    def __init__(self, seconds: int = TRUST_WINDOW_SECONDS):
+        self.size = seconds
+        self.head: int | None = None  # newest second covered by the buckets
+        self.total = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self._totals = [0] * seconds
+        self._errors = [0] * seconds
+        self._latency = [0.0] * seconds
+
+    def _advance(self, sec: int) -> None:
+        if self.head is None:
+            self.head = sec
+            return
+        if sec <= self.head:
+            return
+        # clearing `size` consecutive seconds empties the whole ring
+        steps = min(sec - self.head, self.size)
+        for t in range(sec - steps + 1, sec + 1):
+            i = t % self.size
+            self.total -= self._totals[i]
+            self.errors -= self._errors[i]
+            self.latency_sum -= self._latency[i]
+            self._totals[i] = 0
+            self._errors[i] = 0
+            self._latency[i] = 0.0
+        if self.total == 0:
+            self.latency_sum = 0.0  # drop accumulated float drift
+        self.head = sec
+
+    def add(self, ts: float, error: bool, latency_ms: float) -> None:
+        sec = int(ts)
+        self._advance(sec)
+        if sec <= self.head - self.size:
+            return  # older than the window
+        i = sec % self.size
+        self._totals[i] += 1
+        self.total += 1
+        if error:
+            self._errors[i] += 1
+            self.errors += 1
+        self._latency[i] += latency_ms
+        self.latency_sum += latency_ms
+
+    def totals(self, now: float) -> tuple[int, int, float]:
+        self._advance(int(now))
+        return self.total, self.errors, self.latency_sum
+
+
+class _TrustState:
+    __slots__ = ("window", "score", "status", "saved_score", "saved_status")
+
+    def __init__(self, score: float, status: str):
+        self.window = SlidingWindow()
+        self.score = score
+        self.status = status
+        self.saved_score = score
+        self.saved_status = status
+
+    @property
+    def dirty(self) -> bool:
+        return self.score != self.saved_score or self.status != self.saved_status
+
+
+_states: "OrderedDict[str, _TrustState]" = OrderedDict()
+
+
+async def _load_state(db, plugin_id: str) -> _TrustState | None:
+    plugin = await db.get(Plugin, plugin_id)
+    if not plugin:
+        return None
+
+    state = _TrustState(plugin.trust_score, plugin.status)
+
+    # Seed the window from rows already on disk (e.g. after a restart).
+    window_start = datetime.now(UTC) - timedelta(seconds=TRUST_WINDOW_SECONDS)
+    rows = (await db.execute(
+        select(RequestLog.created_at, RequestLog.error_flag, RequestLog.latency_ms).where(
+            RequestLog.plugin_id == plugin_id,
+            RequestLog.created_at >= window_start,
+        )
+    )).all()
+    for created_at, error_flag, latency_ms in rows:
+        state.window.add(created_at.replace(tzinfo=UTC).timestamp(), error_flag, latency_ms)
+    return state
+
 
-    db.commit()
-    return plugin
\ No newline at end of file
+async def _get_state(db, plugin_id: str) -> _TrustState | None:
+    state = _states.get(plugin_id)
+    if state is not None:
+        _states.move_to_end(plugin_id)
+        return state
+
+    state = await _load_state(db, plugin_id)
+    if state is None:
+        return None
+    _states[plugin_id] = state
+
+    # Bound memory across many plugin ids: forget the least recently seen
+    # plugins whose state is already persisted (it is reloaded on demand).
+    if len(_states) > TRUST_STATE_MAX_PLUGINS:
+        for pid in list(_states.keys()):
+            if len(_states) <= TRUST_STATE_MAX_PLUGINS:
+                break
+            if pid != plugin_id and not _states[pid].dirty:
+                del _states[pid]
+    return state
+
+
+async def record_request(db, plugin_id: str, error_flag: bool, latency_ms: float, at: datetime) -> None:
+    """
+    Add one logged request to the plugin's sliding window and apply one trust
+    step from the window counters. Only in-memory state changes here; call
+    `update_plugin_trust` to persist. Driven solely by the log writer task.
+    """
+    state = await _get_state(db, plugin_id)
+    if state is None:
+        return
+    ts = at.timestamp()
+    state.window.add(ts, error_flag, latency_ms)
+    state.score = _next_score(state.score, *state.window.totals(ts))
+    state.status = _status_from_score(state.score)
+
+
+async def update_plugin_trust(db, plugin_id: str) -> tuple[float, str] | None:
+    """
+    Persist the plugin's trust score/status if they changed since the last
+    write. Adds the UPDATE to the caller's transaction and returns the values
+    written (None if nothing changed); pass them to `mark_trust_saved` once
+    the transaction has committed.
+    """
+    state = _states.get(plugin_id)
+    if state is None or not state.dirty:
+        return None
+    await db.execute(
+        update(Plugin)
+        .where(Plugin.plugin_id == plugin_id)
+        .values(trust_score=state.score, status=state.status)
+    )
+    return state.score, state.status
+
+
+def mark_trust_saved(plugin_id: str, score: float, status: str) -> None:
+    """Record that `score`/`status` are on disk; a failed commit leaves the state dirty."""
+    state = _states.get(plugin_id)
+    if state is not None:
+        state.saved_score = score
+        state.saved_status = status
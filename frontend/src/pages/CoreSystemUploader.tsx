@@ -23,7 +23,7 @@ type Status = {
   app_url?: string | null;
 };
 
-type TreeItem = { name: string; path: string; type: "file" | "dir" };
+type TreeItem = { name: string; path: string; type: "file" | "dir"; size?: number; children?: number };
 
 type ContainersMap = Record<
   string,
@@ -202,6 +202,7 @@ function Dashboard() {
   // Explorer + Editor
   const [cwd, setCwd] = useState<string>("");
   const [items, setItems] = useState<TreeItem[]>([]);
+  const [treeCursor, setTreeCursor] = useState<string | null>(null);
   const [openPath, setOpenPath] = useState<string>("");
   const [editorValue, setEditorValue] = useState<string>("");
   const [dirty, setDirty] = useState(false);
@@ -296,10 +297,12 @@ async function onStopPlugin() {
   }
 
   // File explorer
-  async function loadTree(dir: string) {
-    const { data } = await axios.get(`${API}/core/tree`, { params: { dir } });
+  // Folders are paged by the API; "Load more" fetches the next page with the cursor.
+  async function loadTree(dir: string, cursor?: string) {
+    const { data } = await axios.get(`${API}/core/tree`, { params: { dir, cursor } });
     setCwd(data.cwd);
-    setItems(data.items);
+    setItems((prev) => (cursor ? [...prev, ...data.items] : data.items));
+    setTreeCursor(data.next_cursor ?? null);
   }
   useEffect(() => {
     if (status?.project_present) {
@@ -391,6 +394,18 @@ async function onStopPlugin() {
     setBackUrl(back || "");
   }
 
+  // Long operations (npm install, docker run) come back as a job; poll until it finishes.
+  async function waitForJob(jobId: string, intervalMs = 1000) {
+    for (;;) {
+      const { data } = await axios.get(`${API}/core/jobs/${jobId}`);
+      if (data.finished) {
+        if (data.status !== "succeeded") throw new Error(data.error || `Job ${data.status}`);
+        return data;
+      }
+      await new Promise((r) => setTimeout(r, intervalMs));
+    }
+  }
+
   // Docker helpers
   async function dockerStartSingleButton() {
     const apps: any[] = [];
@@ -428,9 +443,13 @@ async function onStopPlugin() {
 
     setBusy(true);
     try {
-      await axios.post(`${API}/core/docker/start-both`, { apps });
+      const { data } = await axios.post(`${API}/core/docker/start-both`, { apps });
+      const job = await waitForJob(data.job.id);
       await dockerList();
-      alert("Started selected subdirs in Docker.");
+      const failed = Object.entries(job.result?.containers || {})
+        .filter(([, r]: [string, any]) => !r.ok)
+        .map(([subdir, r]: [string, any]) => `${subdir}: ${r.error}`);
+      alert(failed.length ? `Some apps failed to start:\n${failed.join("\n")}` : "Started selected subdirs in Docker.");
     } catch (e: any) {
       alert(e?.response?.data?.detail ?? e.message ?? "Docker start failed");
     } finally {
@@ -900,6 +919,9 @@ async function onStopPlugin() {
                           }}
                         >
                           📁 {it.name}
+                          {typeof it.children === "number" && (
+                            <span style={{ color: "#94a3b8", marginLeft: 4 }}>({it.children})</span>
+                          )}
                         </button>
                       ) : (
                         <button
@@ -917,6 +939,23 @@ async function onStopPlugin() {
                       )}
                     </li>
                   ))}
+                  {treeCursor && (
+                    <li>
+                      <button
+                        onClick={() => loadTree(cwd, treeCursor)}
+                        style={{
+                          background: "#f8fafc",
+                          border: "1px solid #e2e8f0",
+                          borderRadius: 6,
+                          padding: "6px 10px",
+                          cursor: "pointer",
+                          color: "#0f172a",
+                        }}
+                      >
+                        Load more…
+                      </button>
+                    </li>
+                  )}
                 </ul>
               ) : (
                 <div style={{ opacity: 0.6 }}>Upload a project to browse files</div>
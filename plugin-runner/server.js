@@ -1,5 +1,6 @@
 import express from "express";
 import bodyParser from "body-parser";
+import crypto from "crypto";
 import fs from "fs/promises";
 import path from "path";
 import { pathToFileURL } from "url";
@@ -10,32 +11,145 @@ app.use(bodyParser.json({ limit: "2mb" }));
 const PLUGIN_DIR = process.env.PLUGIN_DIR || "/plugin";
 const ENTRY_FILE = process.env.ENTRY || "entry.js";
 
-async function loadEntry() {
+// How often /run may look at the plugin files for changes (0 = every call)
+const RELOAD_CHECK_MS = Number(process.env.RELOAD_CHECK_MS || 1000);
+
+// The loaded entry module, and what the plugin directory looked like when it was loaded.
+// An ESM import can't be evicted, so a reload imports `entry.js?v=<content hash>`: only
+// real changes cost a new module instance, and reverting a change reuses the old one.
+// (Modules imported by entry.js keep their first version until the container restarts.)
+const cache = { mod: null, stamp: null, hash: null, version: 0, checkedAt: 0, loading: null };
+
+// size + mtime of every file under the plugin dir (node_modules skipped)
+async function listFiles(dir, out = []) {
+  for (const ent of await fs.readdir(dir, { withFileTypes: true })) {
+    if (ent.name === "node_modules") continue;
+    const abs = path.join(dir, ent.name);
+    if (ent.isDirectory()) await listFiles(abs, out);
+    else if (ent.isFile()) out.push(abs);
+  }
+  return out.sort();
+}
+
+async function dirStamp() {
+  const files = await listFiles(PLUGIN_DIR);
+  const parts = await Promise.all(files.map(async (f) => {
+    const st = await fs.stat(f);
+    return `${f}:${st.size}:${st.mtimeMs}`;
+  }));
+  return { files, stamp: parts.join("|") };
+}
+
+async function contentHash(files) {
+  const h = crypto.createHash("sha256");
+  for (const f of files) {
+    h.update(f);
+    h.update(await fs.readFile(f));
+  }
+  return h.digest("hex").slice(0, 16);
+}
+
+async function refresh(force) {
   const abs = path.join(PLUGIN_DIR, ENTRY_FILE);
   await fs.stat(abs); // throws if not found
-  // bust cache on every call (simple dev mode)
-  return import(pathToFileURL(abs).href + `?t=${Date.now()}`);
+  const { files, stamp } = await dirStamp();
+  cache.checkedAt = Date.now();
+  if (cache.mod && !force && stamp === cache.stamp) return false;
+  const hash = await contentHash(files);
+  if (cache.mod && !force && hash === cache.hash) {
+    cache.stamp = stamp; // touched, not changed
+    return false;
+  }
+  const query = force ? `?v=${hash}&n=${cache.version + 1}` : `?v=${hash}`;
+  // a broken edit throws here and is retried on the next check; the old module keeps serving
+  cache.mod = await import(pathToFileURL(abs).href + query);
+  cache.stamp = stamp;
+  cache.hash = hash;
+  cache.version += 1;
+  console.log(`[runner] loaded ${ENTRY_FILE} (v${cache.version}, ${hash})`);
+  return true;
+}
+
+// one check at a time; concurrent callers share it
+function reload(force = false) {
+  if (!cache.loading) {
+    cache.loading = refresh(force).finally(() => { cache.loading = null; });
+  }
+  return cache.loading;
 }
 
-app.get("/healthz", (_req, res) => res.json({ ok: true, runner: "ai-plugin-runner" }));
+async function loadEntry() {
+  if (!cache.mod || Date.now() - cache.checkedAt >= RELOAD_CHECK_MS) {
+    try {
+      await reload();
+    } catch (e) {
+      // keep serving the last good version; only fail when nothing has loaded yet
+      if (!cache.mod) throw e;
+      console.log(`[runner] reload failed, keeping v${cache.version}: ${e?.message || e}`);
+    }
+  }
+  return cache.mod;
+}
+
+app.get("/healthz", (_req, res) =>
+  res.json({ ok: true, runner: "ai-plugin-runner", version: cache.version, hash: cache.hash }));
+
+app.post("/reload", async (req, res) => {
+  try {
+    if (cache.loading) await cache.loading.catch(() => {});
+    const reloaded = await reload(Boolean(req.body?.force));
+    res.json({ ok: true, reloaded, version: cache.version, hash: cache.hash });
+  } catch (e) {
+    res.status(500).json({ ok: false, error: String(e?.message || e) });
+  }
+});
+
+// /run statuses the core tells apart: the plugin failed (the runner is fine) vs. it ran out of time
+const PLUGIN_ERROR_STATUS = 422;
+const PLUGIN_TIMEOUT_STATUS = 504;
+
+class PluginTimeout extends Error {}
 
 app.post("/run", async (req, res) => {
+  // the core drops the connection when its own caller goes away; plugins see it on ctx.signal
+  const controller = new AbortController();
+  res.on("close", () => {
+    if (!res.writableFinished) controller.abort();
+  });
+  let timer;
   try {
     const mod = await loadEntry();
     if (!mod.run || typeof mod.run !== "function") {
       throw new Error("Plugin export 'run(input, ctx)' is missing");
     }
-    const timeoutMs = Number(process.env.TIMEOUT_MS || 8000);
-    const ctx = { env: { NODE_ENV: process.env.NODE_ENV || "production" }, metadata: req.body?.metadata || {} };
+    const timeoutMs = Number(req.body?.timeout_ms || process.env.TIMEOUT_MS || 8000);
+    const ctx = {
+      env: { NODE_ENV: process.env.NODE_ENV || "production" },
+      metadata: req.body?.metadata || {},
+      signal: controller.signal,
+    };
     const result = await Promise.race([
       mod.run(req.body?.input || {}, ctx),
-      new Promise((_, rej) => setTimeout(() => rej(new Error("Plugin timed out")), timeoutMs))
+      new Promise((_, rej) => {
+        timer = setTimeout(() => {
+          rej(new PluginTimeout("Plugin timed out"));
+          controller.abort();
+        }, timeoutMs);
+      }),
+      new Promise((_, rej) => controller.signal.addEventListener("abort", () => rej(new Error("Cancelled")), { once: true })),
     ]);
     res.json({ ok: true, result });
   } catch (e) {
-    res.status(500).json({ ok: false, error: String(e?.message || e) });
+    const status = e instanceof PluginTimeout ? PLUGIN_TIMEOUT_STATUS : PLUGIN_ERROR_STATUS;
+    if (!res.destroyed) res.status(status).json({ ok: false, error: String(e?.message || e) });
+  } finally {
+    clearTimeout(timer);
   }
 });
 
 const PORT = Number(process.env.PORT || 9000);
-app.listen(PORT, () => console.log(`[runner] listening on ${PORT}`));
+app.listen(PORT, () => {
+  console.log(`[runner] listening on ${PORT}`);
+  // load before the first /run so a warm container really is warm
+  reload().catch((e) => console.log(`[runner] preload failed: ${e?.message || e}`));
+});